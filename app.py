@@ -1,10 +1,16 @@
-from flask import Flask, render_template
+from flask import Flask
 from flask_cors import CORS
 from flask_socketio import SocketIO
 import logging
 from nexuschat.config import config
 from nexuschat.database import db
 from nexuschat.auth import auth_bp
+from nexuschat.archive import message_archive, run_archiver
+from nexuschat.assets import init_assets
+from nexuschat.memory import memory
+from nexuschat.profiling import profiling_bp, loop_monitor
+from nexuschat.search import search_bp
+from nexuschat.tracing import tracer
 from nexuschat.sockets import init_socketio
 
 # Configure logging
@@ -25,8 +31,16 @@ def create_app():
     # Initialize CORS
     CORS(app, resources={r"/api/*": {"origins": "*"}})
     
-    # Initialize SocketIO (manage_session ensures per-socket session persistence)
-    socketio = SocketIO(app, cors_allowed_origins="*", async_mode='eventlet', manage_session=True)
+    # Initialize SocketIO; socket identity lives in the connection registry,
+    # so no per-socket copy of the Flask session is kept
+    socketio = SocketIO(
+        app,
+        cors_allowed_origins="*",
+        async_mode='eventlet',
+        manage_session=False,
+        ping_interval=config.SOCKET_PING_INTERVAL,
+        ping_timeout=config.SOCKET_PING_TIMEOUT
+    )
     
     # Try to initialize database, but don't fail if it doesn't work
     db_connected = False
@@ -41,14 +55,32 @@ def create_app():
     
     # Register blueprints
     app.register_blueprint(auth_bp)
+    app.register_blueprint(profiling_bp)
+    app.register_blueprint(search_bp)
+    
+    # Diagnostics: trace span log and event loop lag monitor
+    tracer.configure(config.TRACE_LOG_PATH)
+    loop_monitor.start()
+    
+    # Move messages past the retention window into the archive in the background
+    if db_connected and config.RETENTION_DAYS > 0:
+        socketio.start_background_task(run_archiver, socketio, message_archive)
+    
+    # Catch up long-term memory indexes in background tasks, never on the reply path
+    if config.MEMORY_ENABLED:
+        memory.start(socketio)
     
     # Initialize Socket.IO event handlers
     init_socketio(socketio)
     
+    # Hash static assets and pre-render the chat shell once at startup
+    assets = init_assets(app)
+    index_page = assets.render_page(app, 'index.html')
+    
     @app.route('/')
     def index():
         """Serve the main chat interface."""
-        return render_template('index.html')
+        return index_page.respond('no-cache')
     
     @app.route('/health')
     def health():
@@ -58,23 +90,42 @@ def create_app():
     
     return app, socketio
 
-# Create the Flask app for Gunicorn
-try:
-    app, socketio = create_app()
-except Exception as e:
-    logger.error(f"Failed to create application: {e}")
-    # Create a minimal app for Gunicorn
+FALLBACK_PAGE = (
+    '<!DOCTYPE html><html><head><title>NexusChat</title></head>'
+    '<body><h1>NexusChat</h1><p>The service failed to start. Please try again later.</p></body></html>'
+)
+
+def create_fallback_app():
+    """Create a minimal app that reports the startup failure."""
     app = Flask(__name__)
     app.config['SECRET_KEY'] = 'fallback-secret'
     
+    # Asset loading may be what failed, so never let it break the fallback too
+    try:
+        index_page = init_assets(app).render_page(app, 'index.html')
+    except Exception as e:
+        logger.error(f"Failed to render chat page: {e}")
+        index_page = None
+    
     @app.route('/')
     def index():
-        return render_template('index.html')
+        if index_page is None:
+            return FALLBACK_PAGE, 503
+        return index_page.respond('no-cache')
     
     @app.route('/health')
     def health():
         return {'status': 'error', 'message': 'Application failed to initialize'}
     
+    return app
+
+# Create the Flask app for Gunicorn
+try:
+    app, socketio = create_app()
+except Exception as e:
+    logger.error(f"Failed to create application: {e}")
+    # Create a minimal app for Gunicorn
+    app = create_fallback_app()
     socketio = None
 
 def main():
@@ -0,0 +1,159 @@
+"""
+Memory per idle Socket.IO connection and heartbeat cost, end to end.
+
+Each size runs in a fresh process that builds the real app with
+``create_app()`` (eventlet mode), then opens N Engine.IO long-polling
+connections through its WSGI stack with no network: handshake GET,
+Socket.IO connect POST with a JWT, then a GET that drains the welcome
+packets. Every socket then holds its real Engine.IO and Socket.IO
+per-sid state, its environ, its queue and its parked ping greenlet, plus
+the app's registry entry.
+
+Memory is reported two ways: Python heap growth traced by tracemalloc,
+and RSS growth. RSS also covers greenlet stacks and other C allocations
+that tracemalloc cannot see. The heap allocated by the app's own
+ConnectionRegistry is shown separately.
+
+Only the long-polling transport is exercised. WebSocket sockets need a
+real network connection, and per message they are cheaper than polling.
+
+Heartbeat cost is the server side of one ping/pong round per socket:
+what ``Socket._send_ping`` does once its sleep ends (queue a PING), the
+client poll that drains it, and the POST that delivers the PONG and
+reschedules the next ping. It is reported per socket and as the share of
+one core spent on heartbeats at the configured ping interval.
+
+Usage:
+    python benchmarks/connections.py [--sizes 10000 50000 100000] [--users 1000]
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _rss_bytes() -> int:
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * resource.getpagesize()
+
+
+def _request(app, method, query, body=''):
+    from werkzeug.test import EnvironBuilder
+    environ = EnvironBuilder(
+        path='/socket.io/',
+        method=method,
+        query_string=query,
+        data=body,
+        content_type='text/plain;charset=UTF-8'
+    ).get_environ()
+    return b''.join(app.wsgi_app(environ, lambda status, headers, exc_info=None: None)).decode('utf-8')
+
+
+def _connect(app, token) -> str:
+    opened = _request(app, 'GET', {'EIO': '4', 'transport': 'polling', 'token': token})
+    sid = json.loads(opened[1:])['sid']
+    query = {'EIO': '4', 'transport': 'polling', 'sid': sid}
+    _request(app, 'POST', query, '40')
+    _request(app, 'GET', query)
+    return sid
+
+
+def _heartbeat(app, eio_socket, sid):
+    from engineio import packet
+    eio_socket.last_ping = time.time()
+    eio_socket.send(packet.Packet(packet.PING))
+    query = {'EIO': '4', 'transport': 'polling', 'sid': sid}
+    _request(app, 'GET', query)
+    _request(app, 'POST', query, '3')
+
+
+def run(size, users):
+    """Measure one size in this process and print the result as JSON."""
+    import eventlet
+    eventlet.monkey_patch()
+    logging.disable(logging.CRITICAL)
+
+    # Never validate benchmark users against a real database
+    os.environ['MONGODB_URI'] = 'mongodb://127.0.0.1:1/nexuschat'
+
+    import jwt
+    from app import create_app
+    from nexuschat.config import config
+    from nexuschat.connections import connections
+
+    app, socketio = create_app()
+    tokens = [
+        jwt.encode({'username': f'user{i}'}, config.JWT_SECRET, algorithm='HS256')
+        for i in range(users)
+    ]
+
+    # Warm up allocator caches and lazy imports before measuring
+    for i in range(100):
+        _connect(app, tokens[i % users])
+
+    gc.collect()
+    rss_before = _rss_bytes()
+    tracemalloc.start()
+    traced_before = tracemalloc.get_traced_memory()[0]
+    sids = [_connect(app, tokens[i % users]) for i in range(size)]
+    eventlet.sleep(0)
+    gc.collect()
+    traced = tracemalloc.get_traced_memory()[0] - traced_before
+    registry = tracemalloc.take_snapshot().filter_traces(
+        [tracemalloc.Filter(True, '*nexuschat/connections.py')]
+    ).statistics('filename')
+    tracemalloc.stop()
+    rss = _rss_bytes() - rss_before
+    assert len(connections) >= size, 'sockets were not authenticated'
+
+    eio_sockets = socketio.server.eio.sockets
+    started = time.perf_counter()
+    for sid in sids:
+        _heartbeat(app, eio_sockets[sid], sid)
+    heartbeat = (time.perf_counter() - started) / size
+
+    print(json.dumps({
+        'size': size,
+        'traced': traced / size,
+        'registry': sum(stat.size for stat in registry) / size,
+        'rss': rss / size,
+        'heartbeat_us': heartbeat * 1e6,
+        'core_share': heartbeat * size / config.SOCKET_PING_INTERVAL,
+        'ping_interval': config.SOCKET_PING_INTERVAL,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 50000, 100000])
+    parser.add_argument('--users', type=int, default=1000, help='distinct usernames across sockets')
+    parser.add_argument('--run', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run(args.run, args.users)
+        return
+
+    print(f"{'sockets':>8}  {'heap B/conn':>11}  {'registry B/conn':>15}  {'RSS B/conn':>10}  "
+          f"{'ping/pong us':>12}  {'core % at interval':>18}")
+    for size in args.sizes:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--run', str(size), '--users', str(args.users)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{result['size']:>8}  {result['traced']:>11.0f}  {result['registry']:>15.0f}  {result['rss']:>10.0f}  "
+              f"{result['heartbeat_us']:>12.1f}  "
+              f"{result['core_share'] * 100:>14.2f}% @{result['ping_interval']}s")
+
+
+if __name__ == '__main__':
+    main()
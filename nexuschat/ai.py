@@ -4,6 +4,8 @@ import time
 import requests
 from .database import db
 from .config import config
+from .memory import memory
+from .tracing import span, traced
 
 logger = logging.getLogger(__name__)
 
@@ -11,6 +13,7 @@ OPENAI_API_URL = "https://api.openai.com/v1/chat/completions"
 GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent?key={api_key}"
 
 
+@traced('provider.openai')
 def _post_openai(payload: dict) -> requests.Response:
 	"""Post to OpenAI with a short timeout."""
 	headers = {
@@ -70,7 +73,8 @@ def _call_gemini(conversation: list) -> str:
 		}
 	}
 	url = GEMINI_API_URL.format(model=config.GEMINI_MODEL, api_key=config.GEMINI_API_KEY)
-	resp = requests.post(url, headers={"Content-Type": "application/json"}, data=json.dumps(payload), timeout=20)
+	with span('provider.gemini'):
+		resp = requests.post(url, headers={"Content-Type": "application/json"}, data=json.dumps(payload), timeout=20)
 	if resp.status_code != 200:
 		logger.error(f"Gemini API error {resp.status_code}: {resp.text[:400]}")
 		return "Gemini service error."
@@ -83,15 +87,37 @@ def _call_gemini(conversation: list) -> str:
 		return "I couldn't generate a response. Please try again."
 
 
+def _recall_memories(username: str, messages: list):
+	"""Build a system message with relevant messages from before the recent window."""
+	if not config.MEMORY_ENABLED or not messages:
+		return None
+	try:
+		with span('memory.recall'):
+			recalled = memory.recall(username, messages[-1].get("content", ""), before=messages[0].get("created_at"))
+	except Exception as e:
+		logger.error(f"Memory recall error: {e}")
+		return None
+	if not recalled:
+		return None
+	
+	lines = [f"- {'assistant' if sender == 'ai' else 'user'}: {content}" for _, sender, content in recalled]
+	return {
+		"role": "system",
+		"content": "Relevant earlier messages from this conversation:\n" + "\n".join(lines),
+	}
+
+
+@traced('generate_ai_reply')
 def generate_ai_reply(username: str) -> str:
 	"""
 	Generate AI reply using OpenAI first; if quota/rate limited and Gemini is configured, fall back to Gemini.
 	"""
 	try:
 		# Build conversation from recent messages
-		messages = list(
-			db.messages.find({"username": username}).sort("created_at", -1).limit(10)
-		)
+		with span('history.read'):
+			messages = list(
+				db.messages.find({"username": username}).sort("created_at", -1).limit(10)
+			)
 		messages.reverse()
 		conversation = [
 			{
@@ -102,6 +128,10 @@ def generate_ai_reply(username: str) -> str:
 				),
 			}
 		]
+		# Add long-term memory older than the recent window
+		recalled = _recall_memories(username, messages)
+		if recalled:
+			conversation.append(recalled)
 		for msg in messages:
 			role = "assistant" if msg.get("sender") == "ai" else "user"
 			conversation.append({
@@ -0,0 +1,185 @@
+import datetime
+import gzip
+import hashlib
+import json
+import logging
+import os
+from .config import config
+from .database import db
+
+logger = logging.getLogger(__name__)
+
+_CHUNK_SUFFIX = '.jsonl.gz'
+
+
+def _to_ms(value: datetime.datetime) -> int:
+    return int(value.replace(tzinfo=datetime.timezone.utc).timestamp() * 1000)
+
+
+def serialize_message(msg: dict) -> dict:
+    """Convert a stored message into a JSON-safe record."""
+    created_at = msg.get('created_at')
+    return {
+        'sender': msg.get('sender'),
+        'content': msg.get('content', ''),
+        'created_at': created_at.isoformat() if isinstance(created_at, datetime.datetime) else created_at,
+    }
+
+
+def deserialize_message(record: dict, username: str) -> dict:
+    """Turn an archived record back into the shape stored in Mongo."""
+    return {
+        'username': username,
+        'sender': record.get('sender'),
+        'content': record.get('content', ''),
+        'created_at': datetime.datetime.fromisoformat(record['created_at']),
+    }
+
+
+class MessageArchive:
+    """
+    Cold storage for expired messages.
+
+    Each user gets a directory of gzip-compressed JSON-lines chunks named
+    ``<first_ms>-<last_ms>-<first_id>.jsonl.gz``, so a time range can be
+    located from the file names alone and read back one chunk at a time.
+    New messages top up the newest chunk until it holds ``chunk_size``
+    messages, so a user's directory stays small however often the mover runs.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _user_dir(self, username: str) -> str:
+        digest = hashlib.sha1(username.encode('utf-8')).hexdigest()
+        return os.path.join(self.root, digest[:2], digest)
+
+    def write_chunk(self, username: str, messages: list) -> str:
+        """Write messages (oldest first) as one chunk and return its path."""
+        user_dir = self._user_dir(username)
+        os.makedirs(user_dir, exist_ok=True)
+
+        first, last = messages[0], messages[-1]
+        name = f"{_to_ms(first['created_at'])}-{_to_ms(last['created_at'])}-{first.get('_id', '')}{_CHUNK_SUFFIX}"
+        path = os.path.join(user_dir, name)
+
+        # Write to a temporary file first so readers never see a partial chunk
+        tmp_path = path + '.tmp'
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            for msg in messages:
+                f.write(json.dumps(serialize_message(msg)) + '\n')
+        os.replace(tmp_path, path)
+        return path
+
+    def chunks(self, username: str, before: datetime.datetime = None) -> list:
+        """List ``(first_ms, last_ms, path)`` for a user's chunks, oldest first."""
+        user_dir = self._user_dir(username)
+        if not os.path.isdir(user_dir):
+            return []
+
+        limit_ms = _to_ms(before) if before else None
+        newest = {}
+        for name in os.listdir(user_dir):
+            if not name.endswith(_CHUNK_SUFFIX):
+                continue
+            first_ms, last_ms, first_id = name[:-len(_CHUNK_SUFFIX)].split('-', 2)
+            if limit_ms is not None and int(first_ms) >= limit_ms:
+                continue
+            # A topped-up chunk keeps its start; if a crash left the shorter
+            # original behind, only the longer one counts
+            key = (int(first_ms), first_id)
+            if key not in newest or int(last_ms) > newest[key][1]:
+                newest[key] = (int(first_ms), int(last_ms), os.path.join(user_dir, name))
+        return sorted(newest.values())
+
+    def append(self, username: str, messages: list, chunk_size: int) -> list:
+        """Archive messages (oldest first), topping up the newest chunk first."""
+        replaced = None
+        chunks = self.chunks(username)
+        if chunks:
+            path = chunks[-1][2]
+            records = [deserialize_message(r, username) for r in self.iter_chunk(path)]
+            # Records at or after this batch's start come from an earlier run
+            # whose delete never happened; the batch replaces them
+            kept = [msg for msg in records if msg['created_at'] < messages[0]['created_at']]
+            if len(kept) < chunk_size or len(kept) < len(records):
+                if kept:
+                    kept[0]['_id'] = os.path.basename(path)[:-len(_CHUNK_SUFFIX)].split('-', 2)[2]
+                messages = kept + messages
+                replaced = path
+
+        paths = [
+            self.write_chunk(username, messages[i:i + chunk_size])
+            for i in range(0, len(messages), chunk_size)
+        ]
+        if replaced is not None and replaced not in paths:
+            os.remove(replaced)
+        return paths
+
+    def iter_chunk(self, path: str):
+        """Yield the records of one chunk, oldest first."""
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def iter_records(self, username: str):
+        """Yield every archived record for a user, oldest first."""
+        for _, _, path in self.chunks(username):
+            yield from self.iter_chunk(path)
+
+    def read_before(self, username: str, before: datetime.datetime, limit: int) -> list:
+        """Return up to ``limit`` messages older than ``before``, oldest first."""
+        collected = []
+        for _, _, path in reversed(self.chunks(username, before=before)):
+            older = [
+                msg for msg in (deserialize_message(r, username) for r in self.iter_chunk(path))
+                if msg['created_at'] < before
+            ]
+            collected = older + collected
+            if len(collected) >= limit:
+                break
+        return collected[-limit:] if limit > 0 else []
+
+
+def archive_expired_messages(archive: MessageArchive, now: datetime.datetime = None) -> int:
+    """Move messages older than RETENTION_DAYS from Mongo into the archive in batches."""
+    if config.RETENTION_DAYS <= 0 or db.messages is None:
+        return 0
+
+    cutoff = (now or datetime.datetime.utcnow()) - datetime.timedelta(days=config.RETENTION_DAYS)
+    moved = 0
+
+    for username in db.messages.distinct('username', {'created_at': {'$lt': cutoff}}):
+        while True:
+            batch = list(
+                db.messages.find({'username': username, 'created_at': {'$lt': cutoff}})
+                .sort('created_at', 1)
+                .limit(config.ARCHIVE_BATCH_SIZE)
+            )
+            if not batch:
+                break
+
+            archive.append(username, batch, config.ARCHIVE_CHUNK_SIZE)
+
+            # Only delete once the batch is safely on disk
+            db.messages.delete_many({'_id': {'$in': [msg['_id'] for msg in batch]}})
+            moved += len(batch)
+
+    if moved:
+        logger.info(f"Archived {moved} messages older than {cutoff.isoformat()}")
+    return moved
+
+
+def run_archiver(socketio, archive: MessageArchive):
+    """Background task that periodically archives expired messages."""
+    while True:
+        try:
+            archive_expired_messages(archive)
+        except Exception as e:
+            logger.error(f"Archive error: {e}")
+        socketio.sleep(config.ARCHIVE_INTERVAL)
+
+
+# Global archive instance
+message_archive = MessageArchive(config.ARCHIVE_DIR)
@@ -0,0 +1,128 @@
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+from flask import Response, request
+from .config import config
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Only text-like payloads benefit from compression
+_COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+_MIN_COMPRESS_SIZE = 256
+
+
+class Asset:
+    """A static payload held in memory with its precompressed variants."""
+
+    def __init__(self, body: bytes, content_type: str):
+        self.content_type = content_type
+        self.digest = hashlib.sha256(body).hexdigest()
+        self.variants = {'identity': body}
+
+        if content_type.startswith(_COMPRESSIBLE_TYPES) and len(body) >= _MIN_COMPRESS_SIZE:
+            gzipped = gzip.compress(body, compresslevel=9, mtime=0)
+            if len(gzipped) < len(body):
+                self.variants['gzip'] = gzipped
+            if brotli is not None:
+                compressed = brotli.compress(body, quality=11)
+                if len(compressed) < len(body):
+                    self.variants['br'] = compressed
+
+    def etag(self, encoding: str) -> str:
+        """Strong ETag for one encoded representation of this asset."""
+        if encoding == 'identity':
+            return self.digest[:32]
+        return f"{self.digest[:32]}-{encoding}"
+
+    def respond(self, cache_control: str) -> Response:
+        """Build a response, picking the best encoding the client accepts."""
+        offered = [enc for enc in ('br', 'gzip') if enc in self.variants]
+        encoding = request.accept_encodings.best_match(offered, default='identity')
+        etag = self.etag(encoding)
+
+        headers = {
+            'Cache-Control': cache_control,
+            'Vary': 'Accept-Encoding',
+        }
+
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304, headers=headers)
+        else:
+            if encoding != 'identity':
+                headers['Content-Encoding'] = encoding
+            response = Response(self.variants[encoding], mimetype=self.content_type, headers=headers)
+        response.set_etag(etag)
+        return response
+
+
+class AssetRegistry:
+    """Content-hashed static assets and pre-rendered pages, built once at startup."""
+
+    def __init__(self):
+        self.urls = {}
+        self.files = {}
+        self.pages = {}
+
+    def load_static(self, static_folder: str):
+        """Read every file under the static folder and assign it a hashed URL."""
+        if not static_folder or not os.path.isdir(static_folder):
+            return
+
+        for root, _, filenames in os.walk(static_folder):
+            for filename in filenames:
+                if filename.startswith('.'):
+                    continue
+                path = os.path.join(root, filename)
+                logical = os.path.relpath(path, static_folder).replace(os.sep, '/')
+                with open(path, 'rb') as f:
+                    body = f.read()
+
+                content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+                asset = Asset(body, content_type)
+
+                stem, ext = os.path.splitext(logical)
+                hashed = f"{stem}.{asset.digest[:12]}{ext}"
+                self.files[hashed] = asset
+                self.urls[logical] = f"/assets/{hashed}"
+
+        logger.info(f"Loaded {len(self.files)} static assets")
+
+    def asset_url(self, name: str) -> str:
+        """Resolve a logical static path to its content-hashed URL."""
+        url = self.urls.get(name)
+        if url is None:
+            raise KeyError(f"Unknown static asset: {name}")
+        return url
+
+    def render_page(self, app, template: str):
+        """Render a template that has no per-request data and keep the result."""
+        with app.app_context():
+            html = app.jinja_env.get_template(template).render()
+        self.pages[template] = Asset(html.encode('utf-8'), 'text/html')
+        return self.pages[template]
+
+
+def init_assets(app) -> AssetRegistry:
+    """Load static assets, expose ``asset_url`` to templates and serve ``/assets/``."""
+    registry = AssetRegistry()
+    registry.load_static(app.static_folder)
+    app.jinja_env.globals['asset_url'] = registry.asset_url
+
+    immutable = f"public, max-age={config.ASSET_MAX_AGE}, immutable"
+
+    @app.route('/assets/<path:filename>')
+    def hashed_asset(filename):
+        """Serve a content-hashed static asset."""
+        asset = registry.files.get(filename)
+        if asset is None:
+            return {'message': 'Not found'}, 404
+        return asset.respond(immutable)
+
+    return registry
@@ -1,9 +1,11 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from passlib.hash import bcrypt
 import jwt
+import json
 import datetime
 from functools import wraps
 from .database import db
+from .archive import message_archive, serialize_message
 from .config import config
 import logging
 
@@ -45,6 +47,17 @@ def auth_required(f):
     
     return decorated
 
+def admin_required(f):
+    """Decorator to require a JWT for a user listed in ADMIN_USERNAMES."""
+    @wraps(f)
+    @auth_required
+    def decorated(current_user, *args, **kwargs):
+        if current_user['username'] not in config.ADMIN_USERNAMES:
+            return jsonify({'message': 'Admin access required'}), 403
+        return f(current_user, *args, **kwargs)
+    
+    return decorated
+
 @auth_bp.route('/api/register', methods=['POST'])
 def register():
     """Register a new user."""
@@ -142,30 +155,73 @@ def login():
 @auth_bp.route('/api/history', methods=['GET'])
 @auth_required
 def get_history(current_user):
-    """Get user's chat history."""
+    """Get user's chat history, reaching into the archive for older pages."""
     try:
         # Check if database is available
         if not hasattr(db, 'messages') or db.messages is None:
             return jsonify({'message': 'Database service unavailable'}), 503
         
         username = current_user['username']
+        limit = max(1, min(request.args.get('limit', 50, type=int), 200))
         
-        # Get last 50 messages for the user
+        query = {'username': username}
+        before = request.args.get('before')
+        if before:
+            try:
+                before = datetime.datetime.fromisoformat(before)
+            except ValueError:
+                return jsonify({'message': 'Invalid before timestamp'}), 400
+            # Stored timestamps are naive UTC
+            if before.tzinfo is not None:
+                before = before.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+            query['created_at'] = {'$lt': before}
+        
+        # Get the most recent messages for the user
         messages = list(db.messages.find(
-            {'username': username},
+            query,
             {'_id': 0}  # Exclude MongoDB _id
-        ).sort('created_at', -1).limit(50))
+        ).sort('created_at', -1).limit(limit))
         
         # Reverse to show oldest first
         messages.reverse()
         
+        # Fill the rest of the page from archived history
+        if len(messages) < limit:
+            oldest = messages[0]['created_at'] if messages else (before or datetime.datetime.utcnow())
+            messages = message_archive.read_before(username, oldest, limit - len(messages)) + messages
+        
         return jsonify({
-            'messages': messages
+            'messages': messages,
+            'next_before': messages[0]['created_at'].isoformat() if len(messages) == limit else None
         }), 200
         
     except Exception as e:
         logger.error(f"History error: {e}")
         return jsonify({'message': 'Internal server error'}), 500
 
+@auth_bp.route('/api/export', methods=['GET'])
+@auth_required
+def export_history(current_user):
+    """Stream the user's full history, archived then live, as JSON lines."""
+    if not hasattr(db, 'messages') or db.messages is None:
+        return jsonify({'message': 'Database service unavailable'}), 503
+    
+    username = current_user['username']
+    
+    def generate():
+        for record in message_archive.iter_records(username):
+            yield json.dumps(record) + '\n'
+        cursor = db.messages.find(
+            {'username': username},
+            {'_id': 0}
+        ).sort('created_at', 1).batch_size(500)
+        for msg in cursor:
+            yield json.dumps(serialize_message(msg)) + '\n'
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        headers={'Content-Disposition': 'attachment; filename=history.jsonl'}
+    )
 
 
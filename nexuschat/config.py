@@ -13,6 +13,9 @@ class Config:
     # JWT Configuration
     JWT_SECRET = os.getenv('JWT_SECRET', 'please-change-me')
     
+    # Usernames allowed to use the admin diagnostics endpoints (comma-separated)
+    ADMIN_USERNAMES = {name.strip() for name in os.getenv('ADMIN_USERNAMES', '').split(',') if name.strip()}
+    
     # OpenAI Configuration
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
     OPENAI_MODEL = os.getenv('OPENAI_MODEL', 'gpt-4o-mini')
@@ -21,9 +24,44 @@ class Config:
     GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
     GEMINI_MODEL = os.getenv('GEMINI_MODEL', 'gemini-1.5-flash')
     
+    # In-process search index used while MongoDB is unavailable
+    SEARCH_LOCAL_MAX_DOCS = int(os.getenv('SEARCH_LOCAL_MAX_DOCS', 2000))
+    SEARCH_LOCAL_MAX_USERS = int(os.getenv('SEARCH_LOCAL_MAX_USERS', 1000))
+    
+    # Long-term conversational memory
+    MEMORY_ENABLED = os.getenv('MEMORY_ENABLED', 'false').lower() == 'true'
+    MEMORY_EMBEDDER = os.getenv('MEMORY_EMBEDDER', 'hashing')  # 'hashing' (local) or 'openai'
+    EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'text-embedding-3-small')
+    MEMORY_DIM = int(os.getenv('MEMORY_DIM', 256))
+    MEMORY_TOP_K = int(os.getenv('MEMORY_TOP_K', 4))
+    MEMORY_MIN_SCORE = float(os.getenv('MEMORY_MIN_SCORE', 0.3))
+    MEMORY_BATCH_SIZE = int(os.getenv('MEMORY_BATCH_SIZE', 64))
+    MEMORY_DIR = os.getenv('MEMORY_DIR')
+    MEMORY_CACHE_USERS = int(os.getenv('MEMORY_CACHE_USERS', 1000))
+    
     # Server Configuration
     PORT = int(os.getenv('PORT', 5000))
     
+    # Socket.IO heartbeats (seconds); longer intervals cost less per idle socket
+    SOCKET_PING_INTERVAL = int(os.getenv('SOCKET_PING_INTERVAL', 25))
+    SOCKET_PING_TIMEOUT = int(os.getenv('SOCKET_PING_TIMEOUT', 20))
+    
+    # Message retention (0 keeps everything in MongoDB)
+    RETENTION_DAYS = int(os.getenv('RETENTION_DAYS', 0))
+    ARCHIVE_DIR = os.getenv('ARCHIVE_DIR', 'archive')
+    ARCHIVE_BATCH_SIZE = int(os.getenv('ARCHIVE_BATCH_SIZE', 1000))
+    ARCHIVE_CHUNK_SIZE = int(os.getenv('ARCHIVE_CHUNK_SIZE', 5000))
+    ARCHIVE_INTERVAL = int(os.getenv('ARCHIVE_INTERVAL', 3600))
+    
+    # Diagnostics
+    TRACE_ENABLED = os.getenv('TRACE_ENABLED', 'false').lower() == 'true'
+    TRACE_LOG_PATH = os.getenv('TRACE_LOG_PATH')
+    LOOP_LAG_INTERVAL = float(os.getenv('LOOP_LAG_INTERVAL', 0.5))
+    LOOP_LAG_THRESHOLD_MS = float(os.getenv('LOOP_LAG_THRESHOLD_MS', 100))
+    
+    # Static asset caching (content-hashed assets can be cached for a year)
+    ASSET_MAX_AGE = int(os.getenv('ASSET_MAX_AGE', 31536000))
+    
     # Flask Configuration
     SECRET_KEY = os.getenv('SECRET_KEY', JWT_SECRET)
     DEBUG = os.getenv('FLASK_ENV') == 'development'
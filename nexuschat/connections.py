@@ -0,0 +1,35 @@
+import sys
+
+
+class ConnectionRegistry:
+    """
+    Authoritative sid -> username map for connected sockets.
+
+    A plain dict of interned usernames: thousands of sockets for one user
+    share a single string, so an idle socket costs one dict entry.
+    """
+
+    def __init__(self):
+        self._usernames = {}
+
+    def __len__(self) -> int:
+        return len(self._usernames)
+
+    def __contains__(self, sid) -> bool:
+        return sid in self._usernames
+
+    def bind(self, sid: str, username: str):
+        """Attach a username to a socket, replacing any previous binding."""
+        self._usernames[sid] = sys.intern(username)
+
+    def get(self, sid: str):
+        """Return the username bound to a socket, or None."""
+        return self._usernames.get(sid)
+
+    def release(self, sid: str):
+        """Unbind a socket, returning the username it had."""
+        return self._usernames.pop(sid, None)
+
+
+# Global registry of connected sockets
+connections = ConnectionRegistry()
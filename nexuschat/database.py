@@ -1,4 +1,4 @@
-from pymongo import MongoClient, ASCENDING, DESCENDING
+from pymongo import MongoClient, ASCENDING, DESCENDING, TEXT
 from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
 from .config import config
 import logging
@@ -45,6 +45,8 @@ class Database:
         self.messages.create_index([("username", ASCENDING)])
         self.messages.create_index([("created_at", DESCENDING)])
         self.messages.create_index([("username", ASCENDING), ("created_at", DESCENDING)])
+        # Per-user full-text search (username prefix keeps lookups within one user's messages)
+        self.messages.create_index([("username", ASCENDING), ("content", TEXT)], name="username_content_text")
     
     def close(self):
         """Close the MongoDB connection."""
@@ -0,0 +1,349 @@
+import datetime
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+import requests
+from .archive import message_archive
+from .config import config
+from .database import db
+from .search import tokenize
+
+logger = logging.getLogger(__name__)
+
+OPENAI_EMBEDDINGS_URL = "https://api.openai.com/v1/embeddings"
+
+
+def _to_ts(value: datetime.datetime) -> float:
+    return value.replace(tzinfo=datetime.timezone.utc).timestamp()
+
+
+class HashingEmbedder:
+    """
+    Deterministic local embedder using signed feature hashing.
+
+    Unigrams and bigrams are hashed into ``dim`` buckets and the result is
+    L2-normalised, so dot products are cosine similarities. Needs no network
+    and gives identical vectors across processes, which makes it suitable
+    for tests and offline use.
+    """
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.name = 'hashing'
+
+    def _features(self, text: str) -> list:
+        tokens = tokenize(text)
+        return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+    def embed(self, texts: list) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                h = int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'little')
+                vectors[row, h % self.dim] += 1.0 if (h >> 63) & 1 else -1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+
+class OpenAIEmbedder:
+    """Embeds text with the OpenAI embeddings API, one request per batch."""
+
+    def __init__(self, dim: int, model: str):
+        self.dim = dim
+        self.model = model
+        self.name = f"openai:{model}"
+
+    def embed(self, texts: list) -> np.ndarray:
+        resp = requests.post(
+            OPENAI_EMBEDDINGS_URL,
+            headers={
+                "Authorization": f"Bearer {config.OPENAI_API_KEY}",
+                "Content-Type": "application/json",
+            },
+            data=json.dumps({"model": self.model, "input": texts, "dimensions": self.dim}),
+            timeout=20
+        )
+        resp.raise_for_status()
+        data = sorted(resp.json()["data"], key=lambda item: item["index"])
+        vectors = np.asarray([item["embedding"] for item in data], dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+
+def create_embedder():
+    """Build the embedder selected by MEMORY_EMBEDDER."""
+    if config.MEMORY_EMBEDDER == 'openai':
+        return OpenAIEmbedder(config.MEMORY_DIM, config.EMBEDDING_MODEL)
+    if config.MEMORY_EMBEDDER != 'hashing':
+        logger.warning(f"Unknown MEMORY_EMBEDDER {config.MEMORY_EMBEDDER!r}; using hashing")
+    return HashingEmbedder(config.MEMORY_DIM)
+
+
+class UserMemory:
+    """
+    One user's embedded messages.
+
+    Vectors live in a single contiguous float32 matrix that grows by
+    doubling; timestamps sit in a parallel float64 array. When a directory
+    is given, rows are appended to ``vectors.f32`` and ``meta.jsonl`` and
+    reloaded from them on first use. ``header.json`` records the dimension
+    and embedder, and a store written with different ones is discarded.
+    """
+
+    def __init__(self, dim: int, embedder_name: str, directory: str = None):
+        self.dim = dim
+        self.embedder_name = embedder_name
+        self.directory = directory
+        self.caught_up = False
+        self.lock = threading.Lock()
+        self.count = 0
+        self.vectors = np.empty((0, dim), dtype=np.float32)
+        self.timestamps = np.empty(0, dtype=np.float64)
+        self.entries = []
+        if directory:
+            self._load()
+
+    @property
+    def watermark(self) -> float:
+        """Timestamp of the newest embedded message, or 0."""
+        return float(self.timestamps[self.count - 1]) if self.count else 0.0
+
+    def _paths(self):
+        return os.path.join(self.directory, 'vectors.f32'), os.path.join(self.directory, 'meta.jsonl')
+
+    def _header(self) -> dict:
+        return {'dim': self.dim, 'embedder': self.embedder_name}
+
+    def _discard(self):
+        for path in self._paths():
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _load(self):
+        vectors_path, meta_path = self._paths()
+        header_path = os.path.join(self.directory, 'header.json')
+        if os.path.exists(header_path):
+            with open(header_path, 'r', encoding='utf-8') as f:
+                header = json.load(f)
+        else:
+            header = None
+
+        if header != self._header():
+            if os.path.exists(vectors_path) or os.path.exists(meta_path):
+                logger.warning(f"Discarding memory store in {self.directory}: written with {header}, need {self._header()}")
+                self._discard()
+            os.makedirs(self.directory, exist_ok=True)
+            with open(header_path, 'w', encoding='utf-8') as f:
+                json.dump(self._header(), f)
+            return
+
+        if not os.path.exists(vectors_path) or not os.path.exists(meta_path):
+            return
+
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = [json.loads(line) for line in f if line.strip()]
+        vectors = np.fromfile(vectors_path, dtype=np.float32)
+        vectors = vectors[:vectors.size - vectors.size % self.dim].reshape(-1, self.dim)
+
+        # A crash between the two appends can leave them uneven; keep the common prefix
+        count = min(len(meta), len(vectors))
+        self._reserve(count)
+        self.vectors[:count] = vectors[:count]
+        self.timestamps[:count] = [m['ts'] for m in meta[:count]]
+        self.entries = [(m['sender'], m['content']) for m in meta[:count]]
+        self.count = count
+
+    def _reserve(self, needed: int):
+        capacity = len(self.vectors)
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2, 64)
+        vectors = np.empty((capacity, self.dim), dtype=np.float32)
+        timestamps = np.empty(capacity, dtype=np.float64)
+        vectors[:self.count] = self.vectors[:self.count]
+        timestamps[:self.count] = self.timestamps[:self.count]
+        self.vectors, self.timestamps = vectors, timestamps
+
+    def append(self, messages: list, vectors: np.ndarray):
+        """Add embedded messages (oldest first) and persist them if backed by disk."""
+        start, end = self.count, self.count + len(messages)
+        self._reserve(end)
+        self.vectors[start:end] = vectors
+        self.timestamps[start:end] = [_to_ts(m['created_at']) for m in messages]
+        self.entries.extend((m.get('sender'), m.get('content', '')) for m in messages)
+        self.count = end
+
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            vectors_path, meta_path = self._paths()
+            with open(meta_path, 'a', encoding='utf-8') as f:
+                for m in messages:
+                    f.write(json.dumps({
+                        'sender': m.get('sender'),
+                        'content': m.get('content', ''),
+                        'ts': _to_ts(m['created_at'])
+                    }) + '\n')
+            with open(vectors_path, 'ab') as f:
+                f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+
+    def search(self, query: np.ndarray, k: int, before: float = None, min_score: float = 0.0) -> list:
+        """Top-k ``(score, sender, content)`` by cosine similarity."""
+        if not self.count:
+            return []
+        scores = self.vectors[:self.count] @ query
+        if before is not None:
+            scores[self.timestamps[:self.count] >= before] = -np.inf
+
+        k = min(k, self.count)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            (float(scores[i]),) + self.entries[i]
+            for i in top if scores[i] >= min_score
+        ]
+
+
+class ConversationMemory:
+    """
+    Embeds each user's stored messages and recalls the most relevant ones.
+
+    Catching up on a user's backlog (after a restart, eviction or first use)
+    runs as a background task so it never delays a reply; until it finishes,
+    recall searches whatever is already embedded. Once a user is caught up,
+    each turn's new messages are embedded inline by :meth:`remember`.
+    At most ``cache_size`` users are held in memory; evicted users are
+    reloaded from disk or rebuilt in the background.
+    """
+
+    def __init__(self, embedder, directory: str = None, cache_size: int = 1000):
+        self.embedder = embedder
+        self.directory = directory
+        self.cache_size = cache_size
+        self.users = OrderedDict()
+        self._spawn = None
+        self._sleep = lambda seconds: None
+        self._pending = {}
+
+    def start(self, socketio):
+        """Run catch-up indexing as Socket.IO background tasks."""
+        self._spawn = socketio.start_background_task
+        self._sleep = socketio.sleep
+
+    def _user(self, username: str) -> UserMemory:
+        memory = self.users.get(username)
+        if memory is not None:
+            self.users.move_to_end(username)
+            return memory
+
+        directory = None
+        if self.directory:
+            digest = hashlib.sha1(username.encode('utf-8')).hexdigest()
+            directory = os.path.join(self.directory, digest[:2], digest)
+        memory = self.users[username] = UserMemory(self.embedder.dim, self.embedder.name, directory)
+
+        if len(self.users) > self.cache_size:
+            # Skip users whose catch-up is still appending; a fresh instance
+            # would reload their files and embed the same range again
+            for name in self.users:
+                if name not in self._pending:
+                    del self.users[name]
+                    break
+        return memory
+
+    def _schedule(self, username: str):
+        """Queue a background catch-up for a user, coalescing repeated requests."""
+        if self._spawn is None:
+            return
+        if username in self._pending:
+            self._pending[username] = True
+            return
+        self._pending[username] = False
+        self._spawn(self._catch_up, username)
+
+    def _catch_up(self, username: str):
+        try:
+            while True:
+                self.index(username)
+                if not self._pending.get(username):
+                    break
+                self._pending[username] = False
+        except Exception as e:
+            logger.error(f"Memory indexing error for {username}: {e}")
+        finally:
+            self._pending.pop(username, None)
+
+    def _unindexed(self, username: str, since: float):
+        """Yield messages newer than ``since``: archived ones first, then live ones."""
+        since_ms = since * 1000
+        for _, last_ms, path in message_archive.chunks(username):
+            if last_ms <= since_ms:
+                continue
+            for record in message_archive.iter_chunk(path):
+                created_at = datetime.datetime.fromisoformat(record['created_at'])
+                if _to_ts(created_at) > since:
+                    yield dict(record, created_at=created_at)
+
+        if db.messages is not None:
+            after = datetime.datetime.utcfromtimestamp(since)
+            yield from db.messages.find(
+                {'username': username, 'created_at': {'$gt': after}},
+                {'_id': 0, 'sender': 1, 'content': 1, 'created_at': 1}
+            ).sort('created_at', 1).batch_size(config.MEMORY_BATCH_SIZE)
+
+    def index(self, username: str) -> int:
+        """Embed any of the user's messages not yet in memory, in batches."""
+        memory = self._user(username)
+        added = 0
+        with memory.lock:
+            batch = []
+            for msg in self._unindexed(username, memory.watermark):
+                if not msg.get('content'):
+                    continue
+                batch.append(msg)
+                if len(batch) >= config.MEMORY_BATCH_SIZE:
+                    memory.append(batch, self.embedder.embed([m['content'] for m in batch]))
+                    added += len(batch)
+                    batch = []
+                    # Let other greenlets run between batches
+                    self._sleep(0)
+            if batch:
+                memory.append(batch, self.embedder.embed([m['content'] for m in batch]))
+                added += len(batch)
+            memory.caught_up = True
+        return added
+
+    def remember(self, username: str, messages: list) -> int:
+        """Embed a turn's new messages, or schedule a catch-up if the user is behind."""
+        memory = self._user(username)
+        if not memory.caught_up:
+            self._schedule(username)
+            return 0
+
+        with memory.lock:
+            watermark = memory.watermark
+            new = [m for m in messages if m.get('content') and _to_ts(m['created_at']) > watermark]
+            if new:
+                memory.append(new, self.embedder.embed([m['content'] for m in new]))
+        return len(new)
+
+    def recall(self, username: str, text: str, before: datetime.datetime = None) -> list:
+        """Return the most relevant earlier ``(score, sender, content)`` for ``text``."""
+        if not self._user(username).caught_up:
+            self._schedule(username)
+        query = self.embedder.embed([text])[0]
+        return self._user(username).search(
+            query,
+            config.MEMORY_TOP_K,
+            before=_to_ts(before) if before else None,
+            min_score=config.MEMORY_MIN_SCORE
+        )
+
+
+# Global memory instance
+memory = ConversationMemory(create_embedder(), config.MEMORY_DIR, config.MEMORY_CACHE_USERS)
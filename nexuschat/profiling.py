@@ -0,0 +1,223 @@
+import logging
+import os
+import sys
+from collections import Counter
+import eventlet
+from eventlet import patcher
+from flask import Blueprint, request, jsonify, Response
+from .auth import admin_required
+from .config import config
+from .tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+# The sampler must run on a real OS thread so it can observe the eventlet hub
+# even when a greenlet is hogging it.
+_threading = patcher.original('threading')
+_time = patcher.original('time')
+
+profiling_bp = Blueprint('profiling', __name__)
+
+_MAX_STACK_DEPTH = 128
+
+
+def _fold_stack(frame) -> str:
+    """Render a frame chain as a root-first, semicolon-separated stack."""
+    names = []
+    while frame is not None and len(names) < _MAX_STACK_DEPTH:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    names.reverse()
+    return ';'.join(names)
+
+
+class SamplingProfiler:
+    """Periodically samples every thread's stack into collapsed-stack counts."""
+
+    def __init__(self):
+        self._lock = _threading.Lock()
+        self._thread = None
+        self._stop = None
+        self.stacks = Counter()
+        self.samples = 0
+        self.interval = None
+        self.started_at = None
+        self.stopped_at = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self, interval: float) -> bool:
+        """Start sampling; returns False if a session is already running."""
+        with self._lock:
+            if self.running:
+                return False
+            self.stacks = Counter()
+            self.samples = 0
+            self.interval = interval
+            self.started_at = _time.time()
+            self.stopped_at = None
+            self._stop = _threading.Event()
+            self._thread = _threading.Thread(target=self._run, name='nexuschat-profiler', daemon=True)
+            self._thread.start()
+        logger.info(f"Sampling profiler started (interval={interval}s)")
+        return True
+
+    def stop(self) -> bool:
+        """Stop sampling; returns False if no session was running."""
+        with self._lock:
+            if not self.running:
+                return False
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+            self.stopped_at = _time.time()
+        logger.info(f"Sampling profiler stopped after {self.samples} samples")
+        return True
+
+    def _run(self):
+        own_id = _threading.get_ident()
+        while not self._stop.is_set():
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own_id:
+                    self.stacks[_fold_stack(frame)] += 1
+            self.samples += 1
+            self._stop.wait(self.interval)
+
+    def collapsed(self) -> str:
+        """Stacks in the collapsed format read by flamegraph.pl and speedscope."""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def status(self) -> dict:
+        return {
+            'running': self.running,
+            'samples': self.samples,
+            'interval': self.interval,
+            'started_at': self.started_at,
+            'stopped_at': self.stopped_at,
+            'unique_stacks': len(self.stacks),
+        }
+
+
+class LoopLagMonitor:
+    """Measures how late the eventlet hub wakes a sleeping greenlet."""
+
+    def __init__(self, interval: float, threshold: float):
+        self.interval = interval
+        self.threshold = threshold
+        self._greenlet = None
+        self.reset()
+
+    def reset(self):
+        self.last = 0.0
+        self.max = 0.0
+        self.total = 0.0
+        self.count = 0
+        self.slow = 0
+
+    def start(self):
+        if self._greenlet is None and self.interval > 0:
+            self._greenlet = eventlet.spawn(self._run)
+
+    def record(self, lag: float):
+        self.last = lag
+        self.max = max(self.max, lag)
+        self.total += lag
+        self.count += 1
+        if lag >= self.threshold:
+            self.slow += 1
+            logger.warning(f"Event loop lag {lag * 1000:.1f}ms exceeded {self.threshold * 1000:.0f}ms")
+
+    def _run(self):
+        while True:
+            started = _time.monotonic()
+            eventlet.sleep(self.interval)
+            self.record(max(0.0, _time.monotonic() - started - self.interval))
+
+    def stats(self) -> dict:
+        return {
+            'interval_ms': self.interval * 1000,
+            'last_ms': round(self.last * 1000, 3),
+            'max_ms': round(self.max * 1000, 3),
+            'avg_ms': round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            'samples': self.count,
+            'slow_samples': self.slow,
+        }
+
+
+# Global instances
+profiler = SamplingProfiler()
+loop_monitor = LoopLagMonitor(config.LOOP_LAG_INTERVAL, config.LOOP_LAG_THRESHOLD_MS / 1000)
+
+
+@profiling_bp.route('/api/admin/profile/start', methods=['POST'])
+@admin_required
+def start_profile(current_user):
+    """Start a sampling profiler session."""
+    data = request.get_json(silent=True) or {}
+    try:
+        interval = float(data.get('interval_ms', 5)) / 1000
+    except (TypeError, ValueError):
+        return jsonify({'message': 'interval_ms must be a number'}), 400
+    if interval <= 0:
+        return jsonify({'message': 'interval_ms must be positive'}), 400
+
+    if not profiler.start(interval):
+        return jsonify({'message': 'Profiler already running'}), 409
+    logger.info(f"Profiling started by {current_user['username']}")
+    return jsonify(profiler.status()), 200
+
+
+@profiling_bp.route('/api/admin/profile/stop', methods=['POST'])
+@admin_required
+def stop_profile(current_user):
+    """Stop the running profiler session."""
+    if not profiler.stop():
+        return jsonify({'message': 'Profiler not running'}), 409
+    return jsonify(profiler.status()), 200
+
+
+@profiling_bp.route('/api/admin/profile', methods=['GET'])
+@admin_required
+def profile_status(current_user):
+    """Report profiler state."""
+    return jsonify(profiler.status()), 200
+
+
+@profiling_bp.route('/api/admin/profile/dump', methods=['GET'])
+@admin_required
+def dump_profile(current_user):
+    """Download the last session as collapsed stacks."""
+    return Response(
+        profiler.collapsed(),
+        mimetype='text/plain',
+        headers={'Content-Disposition': 'attachment; filename=nexuschat.folded'}
+    )
+
+
+@profiling_bp.route('/api/admin/tracing', methods=['GET', 'POST'])
+@admin_required
+def tracing_control(current_user):
+    """Toggle per-message trace spans and fetch the most recent ones."""
+    if request.method == 'POST':
+        data = request.get_json(silent=True) if request.get_data() else {}
+        if not isinstance(data, dict):
+            return jsonify({'message': 'Request body must be a JSON object'}), 400
+        if 'enabled' in data:
+            if not isinstance(data['enabled'], bool):
+                return jsonify({'message': 'enabled must be true or false'}), 400
+            tracer.enabled = data['enabled']
+            logger.info(f"Tracing {'enabled' if tracer.enabled else 'disabled'} by {current_user['username']}")
+
+    limit = request.args.get('limit', 200, type=int)
+    spans = list(tracer.recent)[-limit:] if limit > 0 else []
+    return jsonify({'enabled': tracer.enabled, 'spans': spans}), 200
+
+
+@profiling_bp.route('/api/admin/loop-lag', methods=['GET'])
+@admin_required
+def loop_lag(current_user):
+    """Report event loop lag statistics."""
+    return jsonify(loop_monitor.stats()), 200
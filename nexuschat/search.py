@@ -0,0 +1,280 @@
+import base64
+import datetime
+import heapq
+import json
+import logging
+import math
+import re
+from bson import ObjectId
+from bson.errors import InvalidId
+from collections import OrderedDict
+from flask import Blueprint, request, jsonify
+from .auth import auth_required
+from .config import config
+from .database import db
+
+logger = logging.getLogger(__name__)
+
+search_bp = Blueprint('search', __name__)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_STOPWORDS = frozenset(
+    'a an and are as at be but by for from has have i in is it its me my of on or '
+    'that the this to was we what when where which who will with you your'.split()
+)
+_SNIPPET_WIDTH = 160
+MAX_RESULTS = 50
+
+
+def tokenize(text: str) -> list:
+    """Lowercase word tokens with stopwords removed."""
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+
+def stem(token: str) -> str:
+    """
+    Light English suffix stripping, close enough to Mongo's text stemmer
+    that "breads" and "bread" or "running" and "run" compare equal.
+    """
+    if token.endswith('ies') and len(token) > 4:
+        token = token[:-3] + 'y'
+    elif token.endswith(('sses', 'xes', 'zes', 'ches', 'shes')):
+        token = token[:-2]
+    elif token.endswith('s') and not token.endswith(('ss', 'us', 'is')) and len(token) > 3:
+        token = token[:-1]
+
+    for suffix in ('ingly', 'edly', 'ing', 'ed', 'ly'):
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            token = token[:-len(suffix)]
+            if token[-1] == token[-2] and token[-1] not in 'lsz':
+                token = token[:-1]
+            break
+
+    if len(token) > 3 and token.endswith('e'):
+        token = token[:-1]
+    return token
+
+
+def index_terms(text: str) -> list:
+    """Stemmed tokens, the form both the offline index and its queries use."""
+    return [stem(t) for t in tokenize(text)]
+
+
+def make_snippet(content: str, terms: set, width: int = _SNIPPET_WIDTH) -> dict:
+    """Cut a window around the first matching term and report match offsets within it."""
+    stems = {stem(t) for t in terms}
+    matches = [m.span() for m in _TOKEN_RE.finditer(content) if stem(m.group().lower()) in stems]
+
+    start = 0
+    if matches and len(content) > width:
+        start = max(0, min(matches[0][0] - width // 4, len(content) - width))
+    end = min(len(content), start + width)
+
+    snippet = content[start:end]
+    highlights = [[s - start, e - start] for s, e in matches if s >= start and e <= end]
+    if start > 0:
+        snippet = '…' + snippet
+        highlights = [[s + 1, e + 1] for s, e in highlights]
+    if end < len(content):
+        snippet += '…'
+    return {'snippet': snippet, 'highlights': highlights}
+
+
+def encode_cursor(score: float, doc_id) -> str:
+    raw = json.dumps({'s': score, 'id': str(doc_id)}).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor: str):
+    """Return ``(score, id)`` from a cursor string, raising ValueError if malformed."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return float(data['s']), data['id']
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+
+class InvertedIndex:
+    """
+    In-process BM25 index over one user's messages.
+
+    Used when MongoDB is unavailable. Postings map each stemmed term to
+    ``{doc_id: term_frequency}``, so it matches the same word forms as
+    Mongo's text index; documents get increasing integer ids.
+    """
+
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self):
+        self.postings = {}
+        self.docs = {}
+        self.lengths = {}
+        self.total_length = 0
+        self._next_id = 0
+
+    def add(self, sender: str, content: str, created_at: datetime.datetime) -> int:
+        doc_id = self._next_id
+        self._next_id += 1
+
+        tokens = index_terms(content)
+        for term in tokens:
+            postings = self.postings.setdefault(term, {})
+            postings[doc_id] = postings.get(doc_id, 0) + 1
+
+        self.docs[doc_id] = (sender, content, created_at)
+        self.lengths[doc_id] = len(tokens)
+        self.total_length += len(tokens)
+        return doc_id
+
+    def evict_oldest(self):
+        """Drop the oldest document and its postings."""
+        doc_id = next(iter(self.docs))
+        _, content, _ = self.docs.pop(doc_id)
+        for term in set(index_terms(content)):
+            postings = self.postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self.postings[term]
+        self.total_length -= self.lengths.pop(doc_id)
+
+    def score(self, terms: list) -> dict:
+        """BM25 scores for every document containing at least one term."""
+        count = len(self.docs)
+        if not count:
+            return {}
+        avg_length = self.total_length / count or 1
+
+        scores = {}
+        for term in {stem(t) for t in terms}:
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings.items():
+                norm = self.K1 * (1 - self.B + self.B * self.lengths[doc_id] / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.K1 + 1) / (tf + norm)
+        return scores
+
+
+class LocalSearchIndex:
+    """
+    Per-user inverted indexes for the offline case.
+
+    Bounded so an outage cannot grow it without limit: each user keeps their
+    newest ``max_docs`` messages and only the ``max_users`` most recently
+    active users are kept.
+    """
+
+    def __init__(self, max_docs: int, max_users: int):
+        self.max_docs = max_docs
+        self.max_users = max_users
+        self.users = OrderedDict()
+
+    def add(self, username: str, sender: str, content: str, created_at: datetime.datetime):
+        index = self.users.get(username)
+        if index is None:
+            index = self.users[username] = InvertedIndex()
+            if len(self.users) > self.max_users:
+                self.users.popitem(last=False)
+        else:
+            self.users.move_to_end(username)
+
+        index.add(sender, content, created_at)
+        while len(index.docs) > self.max_docs:
+            index.evict_oldest()
+
+    def search(self, username: str, terms: list, limit: int, after=None) -> list:
+        """Return ``(score, doc_id, sender, content, created_at)`` ranked by score, id."""
+        index = self.users.get(username)
+        if index is None:
+            return []
+
+        ranked = ((round(score, 6), doc_id) for doc_id, score in index.score(terms).items())
+        if after is not None:
+            after_key = (after[0], int(after[1]))
+            ranked = (r for r in ranked if r < after_key)
+        return [(score, doc_id) + index.docs[doc_id] for score, doc_id in heapq.nlargest(limit, ranked)]
+
+
+# Global offline index
+local_index = LocalSearchIndex(config.SEARCH_LOCAL_MAX_DOCS, config.SEARCH_LOCAL_MAX_USERS)
+
+
+def _search_mongo(username: str, query: str, limit: int, after=None) -> list:
+    pipeline = [
+        {'$match': {'username': username, '$text': {'$search': query}}},
+        {'$addFields': {'score': {'$meta': 'textScore'}}},
+    ]
+    if after is not None:
+        try:
+            after_score, after_id = after[0], ObjectId(after[1])
+        except InvalidId:
+            raise ValueError('Invalid cursor')
+        pipeline.append({'$match': {'$or': [
+            {'score': {'$lt': after_score}},
+            {'score': after_score, '_id': {'$lt': after_id}},
+        ]}})
+    pipeline += [
+        {'$sort': {'score': -1, '_id': -1}},
+        {'$limit': limit},
+        {'$project': {'sender': 1, 'content': 1, 'created_at': 1, 'score': 1}},
+    ]
+    return [
+        (doc['score'], doc['_id'], doc.get('sender'), doc.get('content', ''), doc.get('created_at'))
+        for doc in db.messages.aggregate(pipeline)
+    ]
+
+
+def search_messages(username: str, query: str, limit: int = 20, cursor: str = None) -> dict:
+    """Ranked search over one user's messages, using Mongo's text index when available."""
+    terms = tokenize(query)
+    if not terms:
+        return {'results': [], 'next_cursor': None}
+
+    limit = max(1, min(limit, MAX_RESULTS))
+    after = decode_cursor(cursor) if cursor else None
+
+    if db.messages is not None:
+        hits = _search_mongo(username, query, limit, after)
+    else:
+        hits = local_index.search(username, terms, limit, after)
+
+    term_set = set(terms)
+    results = []
+    for score, doc_id, sender, content, created_at in hits:
+        result = {
+            'id': str(doc_id),
+            'sender': sender,
+            'created_at': created_at.isoformat() if isinstance(created_at, datetime.datetime) else created_at,
+            'score': score,
+        }
+        result.update(make_snippet(content, term_set))
+        results.append(result)
+
+    next_cursor = None
+    if len(hits) == limit:
+        next_cursor = encode_cursor(hits[-1][0], hits[-1][1])
+    return {'results': results, 'next_cursor': next_cursor}
+
+
+@search_bp.route('/api/search', methods=['GET'])
+@auth_required
+def search(current_user):
+    """Search the user's chat history."""
+    query = (request.args.get('q') or '').strip()
+    if not query:
+        return jsonify({'message': 'Query is required'}), 400
+
+    try:
+        return jsonify(search_messages(
+            current_user['username'],
+            query,
+            limit=request.args.get('limit', 20, type=int),
+            cursor=request.args.get('cursor')
+        )), 200
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Search error: {e}")
+        return jsonify({'message': 'Internal server error'}), 500
@@ -1,39 +1,24 @@
 from flask_socketio import emit, disconnect
-from flask import request, session as socket_session
+from flask import request
 import jwt
 import datetime
 from .database import db
 from .config import config
 from .ai import generate_ai_reply
+from .connections import connections
+from .memory import memory
+from .search import local_index, search_messages
+from .tracing import span
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Track connected users by Socket.IO session id
-_connected_sid_to_username = {}
-
 def _get_username_from_context():
-	"""Resolve username from session/map, or from token in query string as a fallback."""
-	username = socket_session.get('username') or _connected_sid_to_username.get(request.sid)
-	if username:
-		return username
-	# Fallback: try decoding token again from the request args
-	token = request.args.get('token')
-	if not token:
-		return None
-	try:
-		payload = jwt.decode(token, config.JWT_SECRET, algorithms=['HS256'])
-		username = payload.get('username')
-		if username:
-			# Cache for subsequent events
-			_connected_sid_to_username[request.sid] = username
-			socket_session['username'] = username
-		return username
-	except Exception:
-		return None
+	"""Resolve the username bound to this socket."""
+	return connections.get(request.sid)
 
 def _bind_username_from_token(token: str):
-	"""Decode token and bind username to this socket session."""
+	"""Decode token and bind username to this socket."""
 	payload = jwt.decode(token, config.JWT_SECRET, algorithms=['HS256'])
 	username = payload['username']
 	
@@ -46,8 +31,7 @@ def _bind_username_from_token(token: str):
 		# If database is not available, just validate the token
 		logger.warning("Database not available - skipping user validation")
 	
-	_connected_sid_to_username[request.sid] = username
-	socket_session['username'] = username
+	connections.bind(request.sid, username)
 	return username
 
 def init_socketio(socketio):
@@ -110,85 +94,137 @@ def init_socketio(socketio):
 	@socketio.on('send_message')
 	def handle_message(data):
 		"""Handle incoming chat messages."""
+		with span('handle_message', sid=request.sid):
+			try:
+				with span('auth.resolve'):
+					username = _get_username_from_context()
+				if not username:
+					logger.warning(f"send_message without auth (sid={request.sid})")
+					emit('system', {'message': 'Not authenticated'})
+					return
+				
+				content = data.get('message', '').strip()
+				
+				if not content:
+					emit('system', {'message': 'Message cannot be empty'})
+					return
+				
+				# Check if database is available for message storage
+				if hasattr(db, 'messages') and db.messages is not None:
+					# Save user message to database
+					user_message = {
+						'username': username,
+						'sender': 'user',
+						'content': content,
+						'created_at': datetime.datetime.utcnow()
+					}
+					
+					with span('db.insert', sender='user'):
+						db.messages.insert_one(user_message)
+					
+					# Emit user message back to client
+					with span('emit', sender='user'):
+						emit('message', {
+							'sender': 'user',
+							'content': content,
+							'timestamp': user_message['created_at'].isoformat()
+						})
+					
+					# Generate AI reply
+					ai_reply = generate_ai_reply(username)
+					
+					# Save AI reply to database
+					ai_message = {
+						'username': username,
+						'sender': 'ai',
+						'content': ai_reply,
+						'created_at': datetime.datetime.utcnow()
+					}
+					
+					with span('db.insert', sender='ai'):
+						db.messages.insert_one(ai_message)
+					
+					# Emit AI reply to client
+					with span('emit', sender='ai'):
+						emit('message', {
+							'sender': 'ai',
+							'content': ai_reply,
+							'timestamp': ai_message['created_at'].isoformat()
+						})
+					
+					# Embed this turn for long-term memory after the reply is out
+					if config.MEMORY_ENABLED:
+						try:
+							with span('memory.remember'):
+								memory.remember(username, [user_message, ai_message])
+						except Exception as e:
+							logger.error(f"Memory update error: {e}")
+					
+					logger.info(f"Message processed for user: {username}")
+				else:
+					# Database not available - keep messages searchable in the local index only
+					created_at = datetime.datetime.utcnow()
+					local_index.add(username, 'user', content, created_at)
+					with span('emit', sender='user'):
+						emit('message', {
+							'sender': 'user',
+							'content': content,
+							'timestamp': created_at.isoformat()
+						})
+					
+					ai_reply = generate_ai_reply(username)
+					created_at = datetime.datetime.utcnow()
+					local_index.add(username, 'ai', ai_reply, created_at)
+					with span('emit', sender='ai'):
+						emit('message', {
+							'sender': 'ai',
+							'content': ai_reply,
+							'timestamp': created_at.isoformat()
+						})
+					
+					logger.info(f"Message processed for user: {username} (no storage)")
+				
+			except Exception as e:
+				logger.error(f"Message handling error: {e}")
+				emit('system', {'message': 'Error processing message'})
+	
+	@socketio.on('search')
+	def handle_search(data):
+		"""Search the user's history; works without MongoDB via the local index."""
 		try:
 			username = _get_username_from_context()
 			if not username:
-				logger.warning(f"send_message without auth (sid={request.sid})")
 				emit('system', {'message': 'Not authenticated'})
 				return
 			
-			content = data.get('message', '').strip()
-			
-			if not content:
-				emit('system', {'message': 'Message cannot be empty'})
+			data = data or {}
+			query = (data.get('q') or '').strip()
+			if not query:
+				emit('system', {'message': 'Search query cannot be empty'})
 				return
 			
-			# Check if database is available for message storage
-			if hasattr(db, 'messages') and db.messages is not None:
-				# Save user message to database
-				user_message = {
-					'username': username,
-					'sender': 'user',
-					'content': content,
-					'created_at': datetime.datetime.utcnow()
-				}
-				
-				db.messages.insert_one(user_message)
-				
-				# Emit user message back to client
-				emit('message', {
-					'sender': 'user',
-					'content': content,
-					'timestamp': user_message['created_at'].isoformat()
-				})
-				
-				# Generate AI reply
-				ai_reply = generate_ai_reply(username)
-				
-				# Save AI reply to database
-				ai_message = {
-					'username': username,
-					'sender': 'ai',
-					'content': ai_reply,
-					'created_at': datetime.datetime.utcnow()
-				}
-				
-				db.messages.insert_one(ai_message)
-				
-				# Emit AI reply to client
-				emit('message', {
-					'sender': 'ai',
-					'content': ai_reply,
-					'timestamp': ai_message['created_at'].isoformat()
-				})
-				
-				logger.info(f"Message processed for user: {username}")
-			else:
-				# Database not available - just generate AI reply without storage
-				emit('message', {
-					'sender': 'user',
-					'content': content,
-					'timestamp': datetime.datetime.utcnow().isoformat()
-				})
-				
-				ai_reply = generate_ai_reply(username)
-				emit('message', {
-					'sender': 'ai',
-					'content': ai_reply,
-					'timestamp': datetime.datetime.utcnow().isoformat()
-				})
-				
-				logger.info(f"Message processed for user: {username} (no storage)")
+			try:
+				limit = int(data.get('limit', 20))
+			except (TypeError, ValueError):
+				limit = 20
 			
+			emit('search_results', search_messages(
+				username,
+				query,
+				limit=limit,
+				cursor=data.get('cursor')
+			))
+		except ValueError as e:
+			emit('system', {'message': str(e)})
 		except Exception as e:
-			logger.error(f"Message handling error: {e}")
-			emit('system', {'message': 'Error processing message'})
+			logger.error(f"Search error: {e}")
+			emit('system', {'message': 'Error searching messages'})
 	
 	@socketio.on('disconnect')
 	def handle_disconnect():
 		"""Handle client disconnection."""
 		try:
-			username = _connected_sid_to_username.pop(request.sid, None) or socket_session.get('username')
+			username = connections.release(request.sid)
 			if username:
 				logger.info(f"User disconnected: {username} (sid={request.sid})")
 			else:
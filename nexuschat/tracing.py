@@ -0,0 +1,105 @@
+import contextvars
+import json
+import logging
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+from .config import config
+
+logger = logging.getLogger(__name__)
+
+# Finished spans are written here as one JSON object per line
+trace_logger = logging.getLogger('nexuschat.trace')
+
+_current_span = contextvars.ContextVar('nexuschat_current_span', default=None)
+
+
+class Span:
+    """A timed unit of work within a single message trace."""
+
+    __slots__ = ('name', 'trace_id', 'span_id', 'parent_id', 'attrs', 'start', 'duration_ms')
+
+    def __init__(self, name: str, trace_id: str, parent_id: str, attrs: dict):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attrs = attrs
+        self.start = time.time()
+        self.duration_ms = None
+
+    def to_dict(self) -> dict:
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start': self.start,
+            'duration_ms': self.duration_ms,
+            'attrs': self.attrs,
+        }
+
+
+class Tracer:
+    """Records spans to the trace log and keeps the most recent ones in memory."""
+
+    def __init__(self, enabled: bool = False, buffer_size: int = 2000):
+        self.enabled = enabled
+        self.recent = deque(maxlen=buffer_size)
+
+    def configure(self, log_path: str = None):
+        """Attach a JSON-lines file handler to the trace logger."""
+        if not log_path or trace_logger.handlers:
+            return
+        handler = logging.FileHandler(log_path)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        trace_logger.addHandler(handler)
+        trace_logger.setLevel(logging.INFO)
+        trace_logger.propagate = False
+        logger.info(f"Writing trace spans to {log_path}")
+
+    def export(self, span: Span):
+        record = span.to_dict()
+        self.recent.append(record)
+        if trace_logger.handlers:
+            trace_logger.info(json.dumps(record, default=str))
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        """Time the enclosed block as a child of the current span, if any."""
+        if not self.enabled:
+            yield None
+            return
+
+        parent = _current_span.get()
+        trace_id = parent.trace_id if parent else uuid.uuid4().hex[:16]
+        current = Span(name, trace_id, parent.span_id if parent else None, attrs)
+        token = _current_span.set(current)
+        started = time.perf_counter()
+        try:
+            yield current
+        except Exception as e:
+            current.attrs['error'] = type(e).__name__
+            raise
+        finally:
+            current.duration_ms = round((time.perf_counter() - started) * 1000, 3)
+            _current_span.reset(token)
+            self.export(current)
+
+    def traced(self, name: str):
+        """Decorator form of :meth:`span`."""
+        def decorator(f):
+            @wraps(f)
+            def decorated(*args, **kwargs):
+                with self.span(name):
+                    return f(*args, **kwargs)
+            return decorated
+        return decorator
+
+
+# Global tracer instance
+tracer = Tracer(enabled=config.TRACE_ENABLED)
+span = tracer.span
+traced = tracer.traced
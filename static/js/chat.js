@@ -0,0 +1,189 @@
+let socket = null;
+let currentToken = null;
+let currentUsername = null;
+
+// API Functions
+async function apiCall(endpoint, data) {
+    try {
+        const response = await fetch(endpoint, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify(data)
+        });
+        return await response.json();
+    } catch (error) {
+        console.error('API Error:', error);
+        return { error: 'Network error' };
+    }
+}
+
+async function register() {
+    const username = document.getElementById('username').value;
+    const password = document.getElementById('password').value;
+    
+    if (!username || !password) {
+        showAuthMessage('Please enter username and password', 'error');
+        return;
+    }
+    
+    const result = await apiCall('/api/register', { username, password });
+    
+    if (result.token) {
+        currentToken = result.token;
+        currentUsername = username;
+        showAuthMessage('Registration successful!', 'success');
+        setTimeout(connectToChat, 500);
+    } else {
+        showAuthMessage(result.message || 'Registration failed', 'error');
+    }
+}
+
+async function login() {
+    const username = document.getElementById('username').value;
+    const password = document.getElementById('password').value;
+    
+    if (!username || !password) {
+        showAuthMessage('Please enter username and password', 'error');
+        return;
+    }
+    
+    const result = await apiCall('/api/login', { username, password });
+    
+    if (result.token) {
+        currentToken = result.token;
+        currentUsername = username;
+        showAuthMessage('Login successful!', 'success');
+        setTimeout(connectToChat, 500);
+    } else {
+        showAuthMessage(result.message || 'Login failed', 'error');
+    }
+}
+
+function showAuthMessage(message, type) {
+    const authMessage = document.getElementById('auth-message');
+    authMessage.textContent = message;
+    authMessage.style.color = type === 'error' ? '#dc3545' : '#28a745';
+    authMessage.style.fontWeight = 'bold';
+}
+
+// Chat Functions
+function connectToChat() {
+    if (!currentToken) {
+        showAuthMessage('No authentication token', 'error');
+        return;
+    }
+    
+    // Initialize Socket.IO connection
+    socket = io({
+        query: {
+            token: currentToken
+        }
+    });
+    
+    // Socket event handlers
+    socket.on('connect', () => {
+        console.log('Connected to chat');
+        // Explicit authenticate handshake
+        socket.emit('authenticate', { token: currentToken });
+        showChatSection();
+    });
+    
+    socket.on('disconnect', () => {
+        console.log('Disconnected from chat');
+        showAuthSection();
+    });
+    
+    socket.on('message', (data) => {
+        addMessage(data.sender, data.content, data.timestamp);
+        hideLoading();
+    });
+    
+    socket.on('system', (data) => {
+        addSystemMessage(data.message);
+    });
+}
+
+function disconnect() {
+    if (socket) {
+        socket.disconnect();
+    }
+    currentToken = null;
+    currentUsername = null;
+    showAuthSection();
+}
+
+function sendMessage() {
+    const input = document.getElementById('message-input');
+    const message = input.value.trim();
+    
+    if (!message || !socket) return;
+    
+    socket.emit('send_message', { message });
+    input.value = '';
+    input.style.height = 'auto';
+    showLoading();
+}
+
+function handleKeyPress(event) {
+    if (event.key === 'Enter' && !event.shiftKey) {
+        event.preventDefault();
+        sendMessage();
+    }
+}
+
+function addMessage(sender, content, timestamp) {
+    const container = document.getElementById('messages-container');
+    const messageDiv = document.createElement('div');
+    messageDiv.className = `message ${sender}`;
+    
+    const time = timestamp ? new Date(timestamp).toLocaleTimeString() : new Date().toLocaleTimeString();
+    
+    messageDiv.innerHTML = `
+        <div class="message-content">
+            ${content}
+            <div class="message-time">${time}</div>
+        </div>
+    `;
+    
+    container.appendChild(messageDiv);
+    container.scrollTop = container.scrollHeight;
+}
+
+function addSystemMessage(message) {
+    const container = document.getElementById('messages-container');
+    const messageDiv = document.createElement('div');
+    messageDiv.className = 'system-message';
+    messageDiv.textContent = message;
+    
+    container.appendChild(messageDiv);
+    container.scrollTop = container.scrollHeight;
+}
+
+function showLoading() {
+    document.getElementById('loading').style.display = 'block';
+}
+
+function hideLoading() {
+    document.getElementById('loading').style.display = 'none';
+}
+
+function showChatSection() {
+    document.getElementById('auth-section').style.display = 'none';
+    document.getElementById('chat-section').style.display = 'flex';
+    document.getElementById('current-user').textContent = currentUsername;
+}
+
+function showAuthSection() {
+    document.getElementById('chat-section').style.display = 'none';
+    document.getElementById('auth-section').style.display = 'block';
+    document.getElementById('messages-container').innerHTML = '<div class="system-message">Connected to chat. Start typing to begin!</div>';
+}
+
+// Auto-resize textarea with max height
+document.getElementById('message-input').addEventListener('input', function() {
+    this.style.height = 'auto';
+    const newHeight = Math.min(this.scrollHeight, 140);
+    this.style.height = newHeight + 'px';
+});
@@ -0,0 +1,25 @@
+import jwt
+import pytest
+from flask import Flask
+from nexuschat.config import config
+from nexuschat.database import db
+
+class _Users:
+    """Minimal users collection in which every username exists."""
+    def find_one(self, query):
+        return {'username': query['username']}
+
+@pytest.fixture
+def authed_client(monkeypatch):
+    """Build a test client for one blueprint, authenticated as ``username``."""
+    monkeypatch.setattr(db, 'users', _Users())
+    
+    def make(blueprint, username):
+        app = Flask(__name__)
+        app.register_blueprint(blueprint)
+        token = jwt.encode({'username': username}, config.JWT_SECRET, algorithm='HS256')
+        client = app.test_client()
+        client.environ_base['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+        return client
+    
+    return make
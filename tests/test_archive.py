@@ -0,0 +1,201 @@
+import datetime
+import json
+import pytest
+from nexuschat import auth
+from nexuschat.auth import auth_bp
+from nexuschat import archive as archive_module
+from nexuschat.archive import MessageArchive, archive_expired_messages
+from nexuschat.config import config
+
+def _messages(start, count, username='alice'):
+    return [
+        {
+            '_id': f'{username}{start + i}',
+            'username': username,
+            'sender': 'user' if i % 2 == 0 else 'ai',
+            'content': f'message {start + i}',
+            'created_at': datetime.datetime(2024, 1, 1) + datetime.timedelta(minutes=start + i),
+        }
+        for i in range(count)
+    ]
+
+def test_chunks_round_trip(tmp_path):
+    """Test archived chunks can be listed and streamed back in order."""
+    archive = MessageArchive(str(tmp_path))
+    archive.write_chunk('alice', _messages(0, 3))
+    archive.write_chunk('alice', _messages(3, 3))
+    
+    assert len(archive.chunks('alice')) == 2
+    assert archive.chunks('bob') == []
+    contents = [r['content'] for r in archive.iter_records('alice')]
+    assert contents == [f'message {i}' for i in range(6)]
+
+def test_read_before_spans_chunks(tmp_path):
+    """Test paging backwards across chunk boundaries."""
+    archive = MessageArchive(str(tmp_path))
+    archive.write_chunk('alice', _messages(0, 3))
+    archive.write_chunk('alice', _messages(3, 3))
+    
+    before = datetime.datetime(2024, 1, 1) + datetime.timedelta(minutes=5)
+    page = archive.read_before('alice', before, 4)
+    assert [m['content'] for m in page] == ['message 1', 'message 2', 'message 3', 'message 4']
+    assert page[0]['username'] == 'alice'
+    assert isinstance(page[0]['created_at'], datetime.datetime)
+
+def test_append_tops_up_the_newest_chunk(tmp_path):
+    """Test small batches fill the newest chunk up to the chunk size."""
+    archive = MessageArchive(str(tmp_path))
+    for start in range(0, 10, 2):
+        archive.append('alice', _messages(start, 2), chunk_size=4)
+    
+    chunks = archive.chunks('alice')
+    assert len(chunks) == 3
+    assert len(list(tmp_path.rglob('*.jsonl.gz'))) == 3
+    assert [r['content'] for r in archive.iter_records('alice')] == [f'message {i}' for i in range(10)]
+
+def test_append_after_failed_delete_does_not_duplicate(tmp_path):
+    """Test re-archiving a batch that was never deleted replaces its copy."""
+    archive = MessageArchive(str(tmp_path))
+    archive.append('alice', _messages(0, 2), chunk_size=4)
+    archive.append('alice', _messages(2, 2), chunk_size=4)
+    archive.append('alice', _messages(2, 2), chunk_size=4)
+    archive.append('alice', _messages(2, 3), chunk_size=4)
+    assert [r['content'] for r in archive.iter_records('alice')] == [f'message {i}' for i in range(5)]
+
+def test_rewriting_a_batch_replaces_its_chunk(tmp_path):
+    """Test re-archiving the same batch after a crash does not duplicate it."""
+    archive = MessageArchive(str(tmp_path))
+    archive.write_chunk('alice', _messages(0, 3))
+    archive.write_chunk('alice', _messages(0, 3))
+    assert len(list(archive.iter_records('alice'))) == 3
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+    
+    def sort(self, key, direction):
+        self.docs = sorted(self.docs, key=lambda d: d[key], reverse=direction < 0)
+        return self
+    
+    def limit(self, count):
+        self.docs = self.docs[:count]
+        return self
+    
+    def batch_size(self, count):
+        return self
+    
+    def __iter__(self):
+        return iter(self.docs)
+
+class _Messages:
+    """Minimal messages collection supporting the history, export and retention queries."""
+    def __init__(self, docs, archive=None):
+        self.docs = docs
+        self.archive = archive
+        self.deleted = []
+    
+    def _match(self, query):
+        docs = self.docs
+        if 'username' in query:
+            docs = [d for d in docs if d['username'] == query['username']]
+        if 'created_at' in query:
+            docs = [d for d in docs if d['created_at'] < query['created_at']['$lt']]
+        return docs
+    
+    def find(self, query, projection=None):
+        docs = self._match(query)
+        if projection and projection.get('_id') == 0:
+            docs = [{k: v for k, v in d.items() if k != '_id'} for d in docs]
+        return _Cursor(docs)
+    
+    def distinct(self, key, query):
+        return sorted({d[key] for d in self._match(query)})
+    
+    def delete_many(self, query):
+        ids = set(query['_id']['$in'])
+        if self.archive is not None:
+            # Every deleted message must already be in a chunk
+            for doc in self.docs:
+                if doc['_id'] in ids:
+                    archived = [r['content'] for r in self.archive.iter_records(doc['username'])]
+                    assert doc['content'] in archived
+        self.deleted.append(len(ids))
+        self.docs = [d for d in self.docs if d['_id'] not in ids]
+
+@pytest.fixture
+def retention(tmp_path, monkeypatch):
+    """Archive and collection with old messages for alice and bob, and two recent ones."""
+    archive = MessageArchive(str(tmp_path))
+    old = _messages(0, 7) + _messages(0, 2, username='bob')
+    recent = _messages(60 * 24 * 3, 2)
+    messages = _Messages(old + recent, archive)
+    monkeypatch.setattr(archive_module.db, 'messages', messages)
+    monkeypatch.setattr(config, 'RETENTION_DAYS', 1)
+    monkeypatch.setattr(config, 'ARCHIVE_BATCH_SIZE', 3)
+    monkeypatch.setattr(config, 'ARCHIVE_CHUNK_SIZE', 4)
+    return archive, messages
+
+def test_archive_expired_messages_moves_in_batches(retention):
+    """Test only messages past the cutoff move, per user and batch, deleted after writing."""
+    archive, messages = retention
+    now = datetime.datetime(2024, 1, 4, 12)
+    
+    assert archive_expired_messages(archive, now=now) == 9
+    assert messages.deleted == [3, 3, 1, 2]
+    assert [d['content'] for d in messages.docs] == ['message 4320', 'message 4321']
+    
+    assert len(archive.chunks('alice')) == 2
+    assert [r['content'] for r in archive.iter_records('alice')] == [f'message {i}' for i in range(7)]
+    assert [r['content'] for r in archive.iter_records('bob')] == ['message 0', 'message 1']
+    
+    assert archive_expired_messages(archive, now=now) == 0
+
+def test_archive_expired_messages_disabled(retention, monkeypatch):
+    """Test nothing moves when RETENTION_DAYS is 0."""
+    archive, messages = retention
+    monkeypatch.setattr(config, 'RETENTION_DAYS', 0)
+    assert archive_expired_messages(archive, now=datetime.datetime(2030, 1, 1)) == 0
+    assert len(messages.docs) == 11
+    assert archive.chunks('alice') == []
+
+@pytest.fixture
+def history_client(authed_client, tmp_path, monkeypatch):
+    """History endpoint with ids 0-5 archived and 6-8 live for alice."""
+    archive = MessageArchive(str(tmp_path))
+    archive.write_chunk('alice', _messages(0, 6))
+    monkeypatch.setattr(auth, 'message_archive', archive)
+    monkeypatch.setattr(auth.db, 'messages', _Messages(_messages(6, 3)))
+    return authed_client(auth_bp, 'alice')
+
+def test_history_pages_from_live_into_archive(history_client):
+    """Test paging back with next_before crosses from Mongo into the archive."""
+    seen = []
+    before = None
+    while True:
+        query = {'limit': 4}
+        if before:
+            query['before'] = before
+        data = history_client.get('/api/history', query_string=query).get_json()
+        seen = [m['content'] for m in data['messages']] + seen
+        before = data['next_before']
+        if not before:
+            break
+    assert seen == [f'message {i}' for i in range(9)]
+
+@pytest.mark.parametrize('suffix', ['Z', '+00:00', '+02:00'])
+def test_history_accepts_aware_before(history_client, suffix):
+    """Test timezone-aware cursors are compared as naive UTC."""
+    before = '2024-01-01T02:05:00' if suffix == '+02:00' else '2024-01-01T00:05:00'
+    response = history_client.get('/api/history', query_string={'before': before + suffix, 'limit': 2})
+    assert response.status_code == 200
+    assert [m['content'] for m in response.get_json()['messages']] == ['message 3', 'message 4']
+
+def test_export_streams_archive_then_live(history_client):
+    """Test the export is archived records followed by live ones, oldest first."""
+    response = history_client.get('/api/export')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    
+    records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [r['content'] for r in records] == [f'message {i}' for i in range(9)]
+    assert records[0] == {'sender': 'user', 'content': 'message 0', 'created_at': '2024-01-01T00:00:00'}
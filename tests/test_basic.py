@@ -1,6 +1,9 @@
 import pytest
+import gzip
 import json
-from app import create_app
+import re
+import app as app_module
+from app import create_app, create_fallback_app
 from nexuschat.database import db
 
 @pytest.fixture
@@ -27,6 +30,42 @@ def test_index_page(client):
     assert response.status_code == 200
     assert b'NexusChat' in response.data
 
+def test_index_page_revalidates_with_etag(client):
+    """Test the pre-rendered page answers conditional requests."""
+    response = client.get('/')
+    assert response.headers['Cache-Control'] == 'no-cache'
+    etag = response.headers['ETag']
+    
+    response = client.get('/', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+
+def test_index_page_precompressed(client):
+    """Test the page is served from its gzip variant when accepted."""
+    response = client.get('/', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert b'NexusChat' in gzip.decompress(response.data)
+
+def test_hashed_asset_is_immutable(client):
+    """Test content-hashed assets are linked from the page and cached long-term."""
+    page = client.get('/').data.decode('utf-8')
+    url = re.search(r'href="(/assets/css/chat\.[0-9a-f]{12}\.css)"', page).group(1)
+    
+    response = client.get(url)
+    assert response.status_code == 200
+    assert 'immutable' in response.headers['Cache-Control']
+    assert response.headers['Vary'] == 'Accept-Encoding'
+    
+    assert client.get('/assets/css/chat.000000000000.css').status_code == 404
+
+def test_socketio_client_is_vendored(client):
+    """Test the Socket.IO client is served locally rather than from a CDN."""
+    page = client.get('/').data.decode('utf-8')
+    assert 'cdnjs' not in page
+    url = re.search(r'src="(/assets/vendor/socket\.io\.min\.[0-9a-f]{12}\.js)"', page).group(1)
+    assert b'Socket.IO v4.7.2' in client.get(url).data
+
 def test_register_endpoint_missing_data(client):
     """Test registration with missing data."""
     response = client.post('/api/register', 
@@ -46,8 +85,35 @@ def test_history_endpoint_unauthorized(client):
     response = client.get('/api/history')
     assert response.status_code == 401
 
+def test_export_endpoint_unauthorized(client):
+    """Test export endpoint without authentication."""
+    response = client.get('/api/export')
+    assert response.status_code == 401
+
+def test_search_endpoint_unauthorized(client):
+    """Test search endpoint without authentication."""
+    response = client.get('/api/search?q=hello')
+    assert response.status_code == 401
+
+def test_admin_profile_unauthorized(client):
+    """Test profiling endpoints require authentication."""
+    response = client.post('/api/admin/profile/start')
+    assert response.status_code == 401
+
 if __name__ == '__main__':
     pytest.main([__file__])
 
 
 
+
+def test_fallback_app_survives_asset_failure(monkeypatch):
+    """Test the fallback app still serves when asset loading is what failed."""
+    def broken(app):
+        raise KeyError('Unknown static asset: js/chat.js')
+    monkeypatch.setattr(app_module, 'init_assets', broken)
+    
+    client = create_fallback_app().test_client()
+    response = client.get('/')
+    assert response.status_code == 503
+    assert b'NexusChat' in response.data
+    assert client.get('/health').get_json()['status'] == 'error'
@@ -0,0 +1,29 @@
+from nexuschat.connections import ConnectionRegistry
+
+def test_bind_get_release():
+    """Test the basic sid lifecycle."""
+    registry = ConnectionRegistry()
+    registry.bind('sid-1', 'alice')
+    
+    assert 'sid-1' in registry
+    assert registry.get('sid-1') == 'alice'
+    
+    assert registry.release('sid-1') == 'alice'
+    assert registry.get('sid-1') is None
+    assert registry.release('sid-1') is None
+    assert len(registry) == 0
+
+def test_usernames_are_shared():
+    """Test sockets for the same user share one username string."""
+    registry = ConnectionRegistry()
+    registry.bind('sid-1', ''.join(['ali', 'ce']))
+    registry.bind('sid-2', ''.join(['al', 'ice']))
+    assert registry.get('sid-1') is registry.get('sid-2')
+
+def test_rebind_replaces_username():
+    """Test re-authenticating a socket updates it in place."""
+    registry = ConnectionRegistry()
+    registry.bind('sid-1', 'alice')
+    registry.bind('sid-1', 'bob')
+    assert len(registry) == 1
+    assert registry.get('sid-1') == 'bob'
@@ -0,0 +1,196 @@
+import datetime
+import numpy as np
+from nexuschat import ai
+from nexuschat import memory as memory_module
+from nexuschat.archive import MessageArchive
+from nexuschat.config import config
+from nexuschat.memory import ConversationMemory, HashingEmbedder, UserMemory
+
+def _message(minute, content, sender='user'):
+    return {
+        'sender': sender,
+        'content': content,
+        'created_at': datetime.datetime(2024, 1, 1) + datetime.timedelta(minutes=minute),
+    }
+
+MESSAGES = [
+    _message(0, 'My dog is called Biscuit and loves the beach'),
+    _message(1, 'I am allergic to peanuts'),
+    _message(2, 'We are planning a trip to Lisbon in May'),
+    _message(3, 'Remind me to water the tomato plants'),
+]
+
+def test_hashing_embedder_is_deterministic():
+    """Test the local embedder is stable and unit-length."""
+    embedder = HashingEmbedder(64)
+    first = embedder.embed(['hello world', ''])
+    second = embedder.embed(['hello world', ''])
+    assert first.dtype == np.float32 and first.shape == (2, 64)
+    assert np.array_equal(first, second)
+    assert np.isclose(np.linalg.norm(first[0]), 1.0)
+    assert not first[1].any()
+
+def test_user_memory_top_k_and_window(tmp_path):
+    """Test retrieval ranks by similarity, skips the recent window and survives reloads."""
+    embedder = HashingEmbedder(256)
+    store = UserMemory(256, 'hashing', str(tmp_path))
+    store.append(MESSAGES, embedder.embed([m['content'] for m in MESSAGES]))
+    
+    query = embedder.embed(['what is my dog called'])[0]
+    top = store.search(query, 2)
+    assert top[0][2] == MESSAGES[0]['content']
+    
+    before = memory_module._to_ts(MESSAGES[0]['created_at'])
+    assert store.search(query, 2, before=before, min_score=0.1) == []
+    
+    reloaded = UserMemory(256, 'hashing', str(tmp_path))
+    assert reloaded.count == 4
+    assert reloaded.watermark == store.watermark
+    assert reloaded.search(query, 1) == top[:1]
+
+def test_index_embeds_in_batches(tmp_path, monkeypatch):
+    """Test catch-up indexing embeds new messages once, in batches."""
+    archive = MessageArchive(str(tmp_path))
+    archive.write_chunk('alice', MESSAGES)
+    monkeypatch.setattr(memory_module, 'message_archive', archive)
+    monkeypatch.setattr(memory_module.db, 'messages', None)
+    monkeypatch.setattr(config, 'MEMORY_BATCH_SIZE', 3)
+    monkeypatch.setattr(config, 'MEMORY_MIN_SCORE', 0.1)
+    
+    embedder = HashingEmbedder(256)
+    batches = []
+    original = embedder.embed
+    monkeypatch.setattr(embedder, 'embed', lambda texts: batches.append(len(texts)) or original(texts))
+    
+    memory = ConversationMemory(embedder)
+    assert memory.index('alice') == 4
+    assert batches == [3, 1]
+    assert memory.index('alice') == 0
+    
+    recalled = memory.recall('alice', 'any peanuts allergic?')
+    assert recalled[0][2] == 'I am allergic to peanuts'
+
+
+def test_store_with_other_embedder_is_discarded(tmp_path):
+    """Test a store written with a different dimension or embedder is not loaded."""
+    embedder = HashingEmbedder(256)
+    store = UserMemory(256, 'hashing', str(tmp_path))
+    store.append(MESSAGES, embedder.embed([m['content'] for m in MESSAGES]))
+    
+    assert UserMemory(128, 'hashing', str(tmp_path)).count == 0
+    assert not (tmp_path / 'vectors.f32').exists()
+    
+    store = UserMemory(256, 'hashing', str(tmp_path))
+    store.append(MESSAGES, embedder.embed([m['content'] for m in MESSAGES]))
+    assert UserMemory(256, 'openai:text-embedding-3-small', str(tmp_path)).count == 0
+
+class _SocketIO:
+    """Records background tasks instead of running them."""
+    def __init__(self):
+        self.tasks = []
+    
+    def start_background_task(self, target, *args):
+        self.tasks.append((target, args))
+    
+    def sleep(self, seconds):
+        pass
+
+def test_recall_and_remember_never_index_inline(tmp_path, monkeypatch):
+    """Test catch-up runs as one background task and only new turns are embedded inline."""
+    archive = MessageArchive(str(tmp_path))
+    archive.write_chunk('alice', MESSAGES[:3])
+    monkeypatch.setattr(memory_module, 'message_archive', archive)
+    monkeypatch.setattr(memory_module.db, 'messages', None)
+    monkeypatch.setattr(config, 'MEMORY_MIN_SCORE', 0.1)
+    
+    socketio = _SocketIO()
+    memory = ConversationMemory(HashingEmbedder(256))
+    memory.start(socketio)
+    
+    assert memory.recall('alice', 'any peanuts allergic?') == []
+    assert memory.remember('alice', MESSAGES[3:]) == 0
+    assert len(socketio.tasks) == 1
+    
+    target, args = socketio.tasks.pop()
+    target(*args)
+    assert memory.users['alice'].count == 3
+    
+    assert memory.remember('alice', MESSAGES[2:]) == 1
+    assert memory.users['alice'].count == 4
+    assert memory.recall('alice', 'any peanuts allergic?')[0][2] == 'I am allergic to peanuts'
+    assert socketio.tasks == []
+
+def test_user_cache_is_bounded_without_directory():
+    """Test the per-user LRU also applies in memory-only mode."""
+    memory = ConversationMemory(HashingEmbedder(64), cache_size=2)
+    for username in ('alice', 'bob', 'alice', 'carol'):
+        memory._user(username)
+    assert list(memory.users) == ['alice', 'carol']
+
+def test_user_with_pending_catch_up_is_not_evicted(tmp_path, monkeypatch):
+    """Test eviction skips a user being indexed, so their store is not embedded twice."""
+    archive = MessageArchive(str(tmp_path / 'archive'))
+    archive.write_chunk('alice', MESSAGES)
+    monkeypatch.setattr(memory_module, 'message_archive', archive)
+    monkeypatch.setattr(memory_module.db, 'messages', None)
+    
+    socketio = _SocketIO()
+    memory = ConversationMemory(HashingEmbedder(64), str(tmp_path / 'memory'), cache_size=1)
+    memory.start(socketio)
+    memory.recall('alice', 'peanuts')
+    pending = memory.users['alice']
+    
+    memory.recall('bob', 'peanuts')
+    assert memory.users['alice'] is pending
+    
+    target, args = socketio.tasks[0]
+    assert args == ('alice',)
+    target(*args)
+    memory.users.clear()
+    assert memory.index('alice') == 0
+    assert memory.users['alice'].count == 4
+
+class _Response:
+    status_code = 200
+    
+    def json(self):
+        return {'choices': [{'message': {'content': 'Noted!'}}]}
+
+class _Recent:
+    """Messages collection returning the recent window, newest first."""
+    def __init__(self, docs):
+        self.docs = docs
+    
+    def find(self, query):
+        return self
+    
+    def sort(self, key, direction):
+        self.docs = sorted(self.docs, key=lambda d: d[key], reverse=direction < 0)
+        return self
+    
+    def limit(self, count):
+        return self.docs[:count]
+
+def test_reply_prompt_includes_recalled_memories(monkeypatch):
+    """Test recalled messages go in a system message before the recent window."""
+    embedder = HashingEmbedder(256)
+    memory = ConversationMemory(embedder)
+    store = memory._user('alice')
+    store.append(MESSAGES, embedder.embed([m['content'] for m in MESSAGES]))
+    store.caught_up = True
+    
+    recent = [_message(10, 'Hi again'), _message(11, 'Hello!', 'ai'), _message(12, 'Can I eat peanuts? I am allergic')]
+    payloads = []
+    monkeypatch.setattr(ai, 'memory', memory)
+    monkeypatch.setattr(ai.db, 'messages', _Recent(recent))
+    monkeypatch.setattr(ai, '_post_openai', lambda payload: payloads.append(payload) or _Response())
+    monkeypatch.setattr(config, 'OPENAI_API_KEY', 'test')
+    monkeypatch.setattr(config, 'MEMORY_ENABLED', True)
+    monkeypatch.setattr(config, 'MEMORY_MIN_SCORE', 0.1)
+    
+    assert ai.generate_ai_reply('alice') == 'Noted!'
+    conversation = payloads[0]['messages']
+    assert conversation[1]['role'] == 'system'
+    assert conversation[1]['content'].startswith('Relevant earlier messages')
+    assert '- user: I am allergic to peanuts' in conversation[1]['content']
+    assert [m['content'] for m in conversation[2:]] == [m['content'] for m in recent]
@@ -0,0 +1,78 @@
+import time
+import pytest
+from nexuschat.config import config
+from nexuschat.profiling import SamplingProfiler, LoopLagMonitor, profiling_bp
+from nexuschat.tracing import Tracer, tracer
+
+def _busy(seconds):
+    deadline = time.time() + seconds
+    while time.time() < deadline:
+        pass
+
+def test_spans_nest_within_a_trace():
+    """Test child spans share the trace id and point at their parent."""
+    tracer = Tracer(enabled=True)
+    with tracer.span('handle_message'):
+        with tracer.span('history.read'):
+            pass
+    
+    child, root = tracer.recent
+    assert root['name'] == 'handle_message' and root['parent_id'] is None
+    assert child['trace_id'] == root['trace_id']
+    assert child['parent_id'] == root['span_id']
+    assert root['duration_ms'] >= child['duration_ms']
+
+def test_disabled_tracer_records_nothing():
+    """Test spans are free when tracing is off."""
+    tracer = Tracer(enabled=False)
+    with tracer.span('handle_message') as current:
+        assert current is None
+    assert len(tracer.recent) == 0
+
+def test_profiler_collects_collapsed_stacks():
+    """Test the sampler sees the busy function and emits folded stacks."""
+    profiler = SamplingProfiler()
+    assert profiler.start(0.001)
+    assert not profiler.start(0.001)
+    _busy(0.2)
+    assert profiler.stop()
+    
+    dump = profiler.collapsed()
+    assert profiler.samples > 0
+    assert '_busy (test_profiling.py' in dump
+    for line in dump.splitlines():
+        stack, count = line.rsplit(' ', 1)
+        assert int(count) > 0
+
+def test_loop_lag_stats():
+    """Test lag samples are aggregated."""
+    monitor = LoopLagMonitor(interval=0.5, threshold=0.1)
+    monitor.record(0.02)
+    monitor.record(0.3)
+    stats = monitor.stats()
+    assert stats['max_ms'] == 300.0
+    assert stats['slow_samples'] == 1
+    assert stats['samples'] == 2
+
+@pytest.fixture
+def admin_client(authed_client, monkeypatch):
+    """Client for the profiling blueprint authenticated as an admin."""
+    monkeypatch.setattr(config, 'ADMIN_USERNAMES', {'root'})
+    return authed_client(profiling_bp, 'root')
+
+def test_tracing_toggle_requires_explicit_flag(admin_client, monkeypatch):
+    """Test tracing state only changes when 'enabled' is given as a boolean."""
+    monkeypatch.setattr(tracer, 'enabled', True)
+    
+    assert admin_client.post('/api/admin/tracing').status_code == 200
+    assert admin_client.post('/api/admin/tracing', json={}).status_code == 200
+    assert tracer.enabled is True
+    
+    assert admin_client.post('/api/admin/tracing', data='nope', content_type='application/json').status_code == 400
+    assert admin_client.post('/api/admin/tracing', json=[1]).status_code == 400
+    assert admin_client.post('/api/admin/tracing', json={'enabled': 'no'}).status_code == 400
+    assert tracer.enabled is True
+    
+    response = admin_client.post('/api/admin/tracing', json={'enabled': False})
+    assert response.get_json()['enabled'] is False
+    assert tracer.enabled is False
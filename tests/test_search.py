@@ -0,0 +1,150 @@
+import datetime
+import jwt
+import pytest
+from bson import ObjectId
+from flask import Flask
+from flask_socketio import SocketIO
+from nexuschat import search
+from nexuschat.config import config
+from nexuschat.search import LocalSearchIndex, encode_cursor, make_snippet, search_messages, stem, tokenize
+from nexuschat.sockets import init_socketio
+
+@pytest.fixture
+def offline_index(monkeypatch):
+    """Route search_messages to a fresh local index."""
+    index = LocalSearchIndex(max_docs=100, max_users=10)
+    monkeypatch.setattr(search.db, 'messages', None)
+    monkeypatch.setattr(search, 'local_index', index)
+    now = datetime.datetime(2024, 1, 1)
+    index.add('alice', 'user', 'How do I make sourdough bread?', now)
+    index.add('alice', 'ai', 'Sourdough bread needs a starter, flour, water and salt.', now)
+    index.add('alice', 'ai', 'Bread flour has more protein than cake flour.', now)
+    index.add('alice', 'user', 'Thanks, what about pizza?', now)
+    index.add('bob', 'user', 'Sourdough sourdough sourdough', now)
+    return index
+
+def test_tokenize_drops_stopwords():
+    """Test tokens are lowercased and stopwords removed."""
+    assert tokenize('What is THE Sourdough starter?') == ['sourdough', 'starter']
+
+def test_snippet_highlights_matches():
+    """Test snippets are cut around the first match with offsets into the snippet."""
+    content = 'x' * 300 + ' the sourdough starter ' + 'y' * 300
+    result = make_snippet(content, {'sourdough'})
+    start, end = result['highlights'][0]
+    assert result['snippet'][start:end] == 'sourdough'
+    assert result['snippet'].startswith('…') and result['snippet'].endswith('…')
+
+def test_snippet_highlights_stemmed_forms():
+    """Test words Mongo matches by stem are highlighted too."""
+    content = 'She was running late and baked two breads'
+    result = make_snippet(content, set(tokenize('run bake bread')))
+    words = [result['snippet'][s:e] for s, e in result['highlights']]
+    assert words == ['running', 'baked', 'breads']
+
+def test_local_index_is_bounded():
+    """Test the offline index caps documents per user and the number of users."""
+    index = LocalSearchIndex(max_docs=2, max_users=2)
+    now = datetime.datetime(2024, 1, 1)
+    for word in ('apple', 'banana', 'cherry'):
+        index.add('alice', 'user', word, now)
+    assert [d[1] for d in index.users['alice'].docs.values()] == ['banana', 'cherry']
+    assert stem('apple') not in index.users['alice'].postings
+    assert index.search('alice', ['apple'], 10) == []
+    
+    index.add('bob', 'user', 'hello', now)
+    index.add('alice', 'user', 'date', now)
+    index.add('carol', 'user', 'hello', now)
+    assert list(index.users) == ['alice', 'carol']
+
+def test_search_is_ranked_and_scoped(offline_index):
+    """Test results rank by relevance and never include other users' messages."""
+    results = search_messages('alice', 'sourdough starter')['results']
+    assert len(results) == 2
+    assert results[0]['snippet'].startswith('Sourdough bread needs a starter')
+    assert results[0]['score'] > results[1]['score']
+    assert search_messages('carol', 'sourdough')['results'] == []
+
+def test_search_cursor_paging(offline_index):
+    """Test paging through results with cursors visits every hit once."""
+    seen = []
+    cursor = None
+    while True:
+        page = search_messages('alice', 'bread flour', limit=1, cursor=cursor)
+        seen.extend(r['id'] for r in page['results'])
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+    assert sorted(seen) == ['0', '1', '2']
+
+def test_search_rejects_bad_cursor(offline_index):
+    """Test malformed cursors raise ValueError."""
+    with pytest.raises(ValueError):
+        search_messages('alice', 'bread', cursor='not-a-cursor')
+
+def test_offline_search_matches_stemmed_forms(offline_index):
+    """Test the local index matches word forms the way Mongo's text index does."""
+    offline_index.add('alice', 'user', 'I baked two loaves of bread', datetime.datetime(2024, 1, 2))
+    for query in ('breads', 'baking'):
+        results = search_messages('alice', query)['results']
+        assert any(r['snippet'] == 'I baked two loaves of bread' for r in results)
+
+class _Messages:
+    """Records aggregate pipelines and returns canned documents."""
+    def __init__(self, docs):
+        self.docs = docs
+        self.pipelines = []
+    
+    def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+        return iter(self.docs)
+
+def test_mongo_search_pipeline(monkeypatch):
+    """Test the $text pipeline and its keyset condition for later pages."""
+    doc_id = ObjectId()
+    messages = _Messages([{
+        '_id': doc_id,
+        'score': 1.5,
+        'sender': 'ai',
+        'content': 'Sourdough bread needs a starter',
+        'created_at': datetime.datetime(2024, 1, 1),
+    }])
+    monkeypatch.setattr(search.db, 'messages', messages)
+    
+    page = search_messages('alice', 'sourdough', limit=1)
+    first = messages.pipelines[0]
+    assert first[0] == {'$match': {'username': 'alice', '$text': {'$search': 'sourdough'}}}
+    assert first[1] == {'$addFields': {'score': {'$meta': 'textScore'}}}
+    assert first[2:4] == [{'$sort': {'score': -1, '_id': -1}}, {'$limit': 1}]
+    assert page['results'][0]['id'] == str(doc_id)
+    assert page['next_cursor'] == encode_cursor(1.5, doc_id)
+    
+    search_messages('alice', 'sourdough', limit=1, cursor=page['next_cursor'])
+    later = messages.pipelines[1]
+    assert later[2] == {'$match': {'$or': [
+        {'score': {'$lt': 1.5}},
+        {'score': 1.5, '_id': {'$lt': doc_id}},
+    ]}}
+    assert later[3:5] == first[2:4]
+
+def test_mongo_search_rejects_non_objectid_cursor(monkeypatch):
+    """Test a cursor from the offline index is rejected by the Mongo path."""
+    monkeypatch.setattr(search.db, 'messages', _Messages([]))
+    with pytest.raises(ValueError):
+        search_messages('alice', 'sourdough', cursor=encode_cursor(1.0, 3))
+
+def test_socket_search_ignores_bad_limit(offline_index, monkeypatch):
+    """Test a non-numeric limit falls back to the default instead of erroring."""
+    monkeypatch.setattr(search.db, 'users', None)
+    app = Flask(__name__)
+    socketio = SocketIO(app)
+    init_socketio(socketio)
+    token = jwt.encode({'username': 'alice'}, config.JWT_SECRET, algorithm='HS256')
+    client = socketio.test_client(app, query_string=f'token={token}')
+    client.get_received()
+    
+    client.emit('search', {'q': 'sourdough', 'limit': 'lots'})
+    received = client.get_received()
+    assert [r['name'] for r in received] == ['search_results']
+    assert len(received[0]['args'][0]['results']) == 2
+    client.disconnect()